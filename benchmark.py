@@ -0,0 +1,221 @@
+# ---------------------------
+# BENCHMARK DEL GENERADOR DE DATOS WEB - MM LADRÓN DEL DOJI
+# ---------------------------
+# Ejecuta el pipeline completo (main) contra historiales sintéticos de tamaño
+# creciente y mide tiempo total, memoria pico y tiempo por etapa. Compara con
+# una línea base guardada para detectar regresiones antes de publicar.
+# Los tiempos se toman sin tracemalloc (que multiplica el coste de cada etapa);
+# la memoria pico se mide después en una pasada aparte que no se cronometra.
+#
+#   python benchmark.py                          # 10k, 100k y 1M operaciones
+#   python benchmark.py --sizes 10000 50000      # tamaños a medida
+#   python benchmark.py --save-baseline          # guarda la línea base actual
+#   python benchmark.py --startup                # arranque en frío de cada subcomando
+from datetime import datetime
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import deal_sources
+import instrumentation
+import update_trading_data
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+# Una regresión debe superar ambos umbrales para contar (evita falsos positivos en tiempos muy cortos)
+REGRESSION_TOLERANCE = 0.25
+REGRESSION_MIN_SECONDS = 0.05
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "update_trading_data.py")
+# Objetivo de arranque en frío (mediana en segundos, proceso nuevo) de cada subcomando.
+# generate incluye la ejecución completa con 10k operaciones sintéticas (sin la
+# simulación de riesgo, que solo se ejecuta con --risk).
+STARTUP_TARGETS = {"import": 0.15, "fallback": 0.25, "validate": 0.25, "generate": 2.0}
+STARTUP_RUNS = 5
+
+def run_pipeline(fuente, json_path):
+    """Ejecuta main() sin salida por consola y devuelve tiempo total y por etapa"""
+    # Las cifras de prueba nunca se incrustan en la página del proyecto
+    update_trading_data.STATIC_PAGE_PATH = None
+    timer = instrumentation.StageTimer()
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        update_trading_data.main(fuente, json_path, timer=timer)
+    wall = time.perf_counter() - inicio
+
+    return {
+        "wall": round(wall, 4),
+        "stages": {etapa: round(t, 4) for etapa, t in timer.stages.items()}
+    }
+
+def peak_memory_mb(fuente, json_path):
+    """Ejecuta main() con tracemalloc (sin cronometrar) y devuelve la memoria pico en MB"""
+    update_trading_data.STATIC_PAGE_PATH = None
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            update_trading_data.main(fuente, json_path, timer=instrumentation.StageTimer())
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(pico / 1024 / 1024, 2)
+
+def run_size(num_deals, num_symbols):
+    """Mide una ejecución en frío (historial completo) y otra incremental sobre el mismo almacén"""
+    tmp = tempfile.mkdtemp(prefix="bench_")
+    try:
+        inicio = time.perf_counter()
+        fuente = deal_sources.SyntheticSource(num_deals=num_deals, num_symbols=num_symbols, store_dir=os.path.join(tmp, "store"))
+        generacion = time.perf_counter() - inicio
+        json_path = os.path.join(tmp, "web_data.json")
+        frio = run_pipeline(fuente, json_path)
+        caliente = run_pipeline(fuente, json_path)
+
+        # La misma secuencia frío/incremental, con su propio almacén, para la memoria
+        fuente_memoria = copy.copy(fuente)
+        fuente_memoria.store_dir = os.path.join(tmp, "store_memory")
+        json_memoria = os.path.join(tmp, "memory", "web_data.json")
+        frio["peak_mb"] = peak_memory_mb(fuente_memoria, json_memoria)
+        caliente["peak_mb"] = peak_memory_mb(fuente_memoria, json_memoria)
+
+        return {
+            "deals": num_deals,
+            "symbols": num_symbols,
+            "synthetic_generation": round(generacion, 4),
+            "cold": frio,
+            "warm": caliente,
+        }
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def compare_with_baseline(resultados, baseline):
+    """Devuelve la lista de regresiones respecto a la línea base"""
+    base_por_tamaño = {str(r["deals"]): r for r in baseline.get("results", [])}
+    regresiones = []
+
+    for r in resultados:
+        base = base_por_tamaño.get(str(r["deals"]))
+        if base is None:
+            continue
+        for modo in ("cold", "warm"):
+            medidas = [("wall", r[modo]["wall"], base[modo]["wall"])]
+            medidas += [(f"stage:{e}", t, base[modo]["stages"].get(e)) for e, t in r[modo]["stages"].items()]
+            for nombre, actual, anterior in medidas:
+                if anterior is None:
+                    continue
+                if actual > anterior * (1 + REGRESSION_TOLERANCE) and actual - anterior > REGRESSION_MIN_SECONDS:
+                    regresiones.append(f"{r['deals']} {modo} {nombre}: {anterior:.3f}s -> {actual:.3f}s")
+    return regresiones
+
+def measure_startup(runs=STARTUP_RUNS):
+    """Mediana del tiempo de cada subcomando lanzado en un proceso nuevo"""
+    tmp = tempfile.mkdtemp(prefix="startup_")
+    try:
+        json_path = os.path.join(tmp, "web_data.json")
+        comandos = {
+            "import": [sys.executable, "-c", f"import sys; sys.path.insert(0, {os.path.dirname(SCRIPT_PATH)!r}); import update_trading_data"],
+            "fallback": [sys.executable, SCRIPT_PATH, "fallback", "--output", json_path],
+            "validate": [sys.executable, SCRIPT_PATH, "validate", json_path],
+            "generate": [sys.executable, SCRIPT_PATH, "generate", "--source", "synthetic", "--deals", "10000",
+                         "--output", os.path.join(tmp, "generate", "web_data.json"), "--page", "", "--run-log", os.path.join(tmp, "run_log.ndjson")],
+        }
+        # Los almacenes temporales de la fuente sintética también quedan dentro de tmp
+        entorno = dict(os.environ, TMPDIR=tmp, TEMP=tmp, TMP=tmp, PYTHONIOENCODING="utf-8")
+
+        tiempos = {}
+        for nombre, comando in comandos.items():
+            medidas = []
+            for _ in range(runs):
+                inicio = time.perf_counter()
+                subprocess.run(comando, capture_output=True, check=True, env=entorno)
+                medidas.append(time.perf_counter() - inicio)
+            tiempos[nombre] = round(statistics.median(medidas), 4)
+        return tiempos
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def check_startup():
+    """Compara el arranque de cada subcomando con su objetivo. Devuelve el código de salida"""
+    print("⏱️ ARRANQUE EN FRÍO POR SUBCOMANDO")
+    tiempos = measure_startup()
+    fuera_de_objetivo = []
+    for nombre, t in tiempos.items():
+        objetivo = STARTUP_TARGETS[nombre]
+        icono = "✅" if t <= objetivo else "❌"
+        print(f"{icono} {nombre:>9}: {t:.3f}s (objetivo {objetivo:.2f}s)")
+        if t > objetivo:
+            fuera_de_objetivo.append(nombre)
+    return 1 if fuera_de_objetivo else 0
+
+def print_results(resultados):
+    print("\n" + "=" * 78)
+    print(f"{'Operaciones':>12} {'Modo':>5} {'Total (s)':>10} {'Pico (MB)':>10}  Etapas (s)")
+    print("=" * 78)
+    for r in resultados:
+        for modo in ("cold", "warm"):
+            etapas = ", ".join(f"{e}={t:.3f}" for e, t in r[modo]["stages"].items())
+            print(f"{r['deals']:>12} {modo:>5} {r[modo]['wall']:>10.3f} {r[modo]['peak_mb']:>10.1f}  {etapas}")
+    print("=" * 78)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del generador de datos web")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="número de operaciones por ejecución")
+    parser.add_argument("--symbols", type=int, default=50, help="símbolos distintos en el historial sintético")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="ruta de la línea base")
+    parser.add_argument("--save-baseline", action="store_true", help="guardar los resultados como nueva línea base")
+    parser.add_argument("--output", help="guardar los resultados en este JSON")
+    parser.add_argument("--startup", action="store_true", help="medir solo el arranque en frío de cada subcomando")
+    args = parser.parse_args()
+
+    if args.startup:
+        return check_startup()
+
+    print("⏱️ BENCHMARK - GENERADOR DE DATOS WEB")
+    resultados = []
+    for tamaño in args.sizes:
+        print(f"🔄 {tamaño} operaciones...")
+        resultados.append(run_size(tamaño, args.symbols))
+    print_results(resultados)
+
+    informe = {
+        "date": datetime.now().strftime("%d/%m/%Y %H:%M"),
+        "python": sys.version.split()[0],
+        "results": resultados
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2)
+        print(f"💾 Línea base guardada en: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("ℹ️ Sin línea base guardada (usa --save-baseline para crearla)")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        regresiones = compare_with_baseline(resultados, json.load(f))
+
+    if regresiones:
+        print("❌ REGRESIONES DE RENDIMIENTO:")
+        for regresion in regresiones:
+            print(f"   - {regresion}")
+        return 1
+
+    print("✅ Sin regresiones respecto a la línea base")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+# ---------------------------
+# FUENTES DE OPERACIONES - MM LADRÓN DEL DOJI
+# ---------------------------
+# Todas las fuentes exponen la misma interfaz que el módulo MetaTrader5
+# (initialize, shutdown, last_error, terminal_info, history_deals_get) más
+# history_deals_columns() / history_deals_frame(), que devuelven directamente
+# las columnas del almacén. history_deals_columns() se divide en fetch_window()
+# (la llamada a la sesión, siempre desde el mismo hilo y de una en una) y
+# decode_window() (la conversión a columnas, que sí puede ir en otro hilo).
+# Cada fuente tiene su propio store_dir para no mezclar datos sintéticos con el
+# almacén real de la cuenta.
+#   - MT5Source:       terminal MetaTrader 5 real (importa MetaTrader5 al conectar)
+#   - SyntheticSource: historial sintético de 10k a 10M operaciones, sin terminal
+#   - ReplaySource:    reproduce un almacén columnar (datos_mt5) ya guardado
+from collections import namedtuple
+from datetime import datetime
+import tempfile
+import numpy as np
+import deal_store
+import metrics_engine
+
+# Mismos campos y orden que MetaTrader5.TradeDeal
+TradeDeal = namedtuple("TradeDeal", [
+    "ticket", "order", "time", "time_msc", "type", "entry", "magic", "position_id", "reason",
+    "volume", "price", "commission", "swap", "profit", "fee", "symbol", "comment", "external_id"
+])
+
+SYNTHETIC_SYMBOLS = ["DBX", "RCL", "HWM", "GSLC", "EURUSD", "GBPUSD", "USDJPY", "XAUUSD", "US30"]
+
+class MT5Source:
+    """Adaptador del terminal MetaTrader 5 real"""
+
+    name = "MT5 Real"
+
+    def __init__(self, store_dir=deal_store.DATA_DIR, **kwargs):
+        self._mt5 = None
+        self.store_dir = store_dir
+        self._kwargs = kwargs  # path, login, password, server... para mt5.initialize()
+
+    def initialize(self):
+        try:
+            import MetaTrader5
+        except ImportError:
+            print("❌ El paquete MetaTrader5 no está instalado (solo disponible en Windows)")
+            return False
+        self._mt5 = MetaTrader5
+        return self._mt5.initialize(**self._kwargs)
+
+    def shutdown(self):
+        if self._mt5 is not None:
+            self._mt5.shutdown()
+
+    def last_error(self):
+        return self._mt5.last_error() if self._mt5 is not None else (-1, "MetaTrader5 no disponible")
+
+    def terminal_info(self):
+        return self._mt5.terminal_info() if self._mt5 is not None else None
+
+    def history_deals_get(self, desde, hasta):
+        return self._mt5.history_deals_get(desde, hasta)
+
+    def fetch_window(self, desde, hasta):
+        return self.history_deals_get(desde, hasta)
+
+    def decode_window(self, trades):
+        if trades is None or len(trades) == 0:
+            return None
+        # La tupla de namedtuples se suelta en cuanto se convierte a columnas
+        return deal_store.records_to_columns(trades)
+
+    def history_deals_columns(self, desde, hasta):
+        return self.decode_window(self.fetch_window(desde, hasta))
+
+    def history_deals_frame(self, desde, hasta):
+        columnas = self.history_deals_columns(desde, hasta)
+        if columnas is None:
+            return None
+        return deal_store.columns_to_frame(*columnas)
+
+class _ColumnarSource:
+    """Base para fuentes que guardan el historial en memoria como columnas ordenadas por tiempo"""
+
+    def __init__(self, store_dir=None):
+        self.columns = None
+        self.symbols = None
+        # Por defecto un almacén temporal: cada proceso empieza con una sincronización completa
+        self.store_dir = store_dir or tempfile.mkdtemp(prefix="deals_")
+
+    def initialize(self):
+        return True
+
+    def shutdown(self):
+        pass
+
+    def last_error(self):
+        return (1, "Success")
+
+    def terminal_info(self):
+        return {"connected": True, "name": self.name}
+
+    def _slice(self, desde, hasta):
+        tiempos = self.columns["time"]
+        i = np.searchsorted(tiempos, metrics_engine.to_epoch_seconds(desde), side='left')
+        j = np.searchsorted(tiempos, metrics_engine.to_epoch_seconds(hasta), side='right')
+        return {c: v[i:j] for c, v in self.columns.items()}
+
+    def history_deals_columns(self, desde, hasta):
+        tramo = self._slice(desde, hasta)
+        if len(tramo["time"]) == 0:
+            return None
+        filtro = tramo["type"] <= 1
+        return {c: v[filtro] for c, v in tramo.items()}, self.symbols
+
+    def fetch_window(self, desde, hasta):
+        # Las columnas ya están en memoria: no hay nada que decodificar aparte
+        return self.history_deals_columns(desde, hasta)
+
+    def decode_window(self, columnas):
+        return columnas
+
+    def history_deals_frame(self, desde, hasta):
+        columnas = self.history_deals_columns(desde, hasta)
+        if columnas is None:
+            return None
+        return deal_store.columns_to_frame(*columnas)
+
+    def history_deals_get(self, desde, hasta):
+        """Devuelve tuplas TradeDeal como el terminal real (lento a propósito: una tupla por operación)"""
+        tramo = self._slice(desde, hasta)
+        n = len(tramo["time"])
+        if n == 0:
+            return ()
+        ceros = [0] * n
+        return tuple(map(TradeDeal._make, zip(
+            tramo["ticket"].tolist(), tramo["ticket"].tolist(), tramo["time"].tolist(),
+            (tramo["time"] * 1000).tolist(), tramo["type"].tolist(), tramo["entry"].tolist(), ceros,
+            tramo["position_id"].tolist(), ceros, tramo["volume"].tolist(), tramo["price"].tolist(),
+            [0.0] * n, [0.0] * n, tramo["profit"].tolist(), [0.0] * n,
+            self.symbols[tramo["symbol"]].tolist(), [""] * n, [""] * n
+        )))
+
+class SyntheticSource(_ColumnarSource):
+    """Genera un historial sintético de posiciones (entrada + salida) con NumPy vectorizado"""
+
+    name = "Sintético"
+
+    def __init__(self, num_deals=10_000, num_symbols=20, inicio=datetime(2024, 1, 1), fin=None, seed=42, store_dir=None):
+        super().__init__(store_dir)
+        fin = fin or datetime.now()
+        rng = np.random.default_rng(seed)
+        n_pos = max(num_deals // 2, 1)
+
+        extra = max(num_symbols - len(SYNTHETIC_SYMBOLS), 0)
+        self.symbols = np.array((SYNTHETIC_SYMBOLS + [f"SYM{i:04d}" for i in range(extra)])[:num_symbols], dtype=object)
+
+        inicio_s = int(metrics_engine.to_epoch_seconds(inicio))
+        fin_s = int(metrics_engine.to_epoch_seconds(fin))
+        apertura = np.sort(rng.integers(inicio_s, fin_s, n_pos))
+        cierre = np.minimum(apertura + 60 + rng.exponential(6 * 3600, n_pos).astype(np.int64), fin_s)
+        direccion = rng.integers(0, 2, n_pos).astype(np.int8)
+        simbolo = rng.integers(0, len(self.symbols), n_pos).astype(np.int32)
+        volumen = np.round(rng.uniform(1, 200, n_pos))
+        precio = np.round(rng.uniform(10, 500, n_pos), 2)
+        profit = np.round(rng.normal(2.0, 15.0, n_pos), 2)
+
+        # Entradas y salidas intercaladas y ordenadas por tiempo; los tickets siguen ese orden
+        tiempos = np.concatenate([apertura, cierre])
+        orden = np.argsort(tiempos, kind='stable')
+        position_id = np.arange(1, n_pos + 1, dtype=np.int64) + 1_000_000
+        self.columns = {
+            "ticket": np.arange(1, 2 * n_pos + 1, dtype=np.int64),
+            "time": tiempos[orden],
+            "type": np.concatenate([direccion, 1 - direccion])[orden],
+            "entry": np.concatenate([np.zeros(n_pos, np.int8), np.ones(n_pos, np.int8)])[orden],
+            "position_id": np.concatenate([position_id, position_id])[orden],
+            "volume": np.concatenate([volumen, volumen])[orden],
+            "price": np.concatenate([precio, np.round(precio * (1 + rng.normal(0, 0.01, n_pos)), 2)])[orden],
+            "profit": np.concatenate([np.zeros(n_pos), profit])[orden],
+            "symbol": np.concatenate([simbolo, simbolo])[orden],
+        }
+
+class ReplaySource(_ColumnarSource):
+    """Reproduce un almacén columnar guardado (por ejemplo, una copia de datos_mt5)"""
+
+    name = "Replay"
+
+    def __init__(self, data_dir=deal_store.DATA_DIR, store_dir=None):
+        super().__init__(store_dir)
+        columnas, symbols = deal_store.load_columns(data_dir)
+        # Copia en memoria: el almacén de origen no queda mapeado ni se modifica
+        self.columns = {c: np.array(v) for c, v in columnas.items()}
+        self.symbols = np.array(symbols, dtype=object)
+
+def get_source(nombre="mt5", **kwargs):
+    """Crea una fuente por nombre: 'mt5', 'synthetic' o 'replay'"""
+    fuentes = {"mt5": MT5Source, "synthetic": SyntheticSource, "replay": ReplaySource}
+    if nombre not in fuentes:
+        raise ValueError(f"Fuente de operaciones desconocida: {nombre}")
+    return fuentes[nombre](**kwargs)
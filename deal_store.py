@@ -0,0 +1,236 @@
+# ---------------------------
+# ALMACÉN COLUMNAR DE OPERACIONES - MM LADRÓN DEL DOJI
+# ---------------------------
+# Cada columna se guarda como un fichero binario plano (<columna>.bin) que se
+# abre con np.memmap, así que cargar el historial no requiere trabajo por fila
+# en Python y la memoria no crece con el número de operaciones.
+# checkpoint.json es la fuente de verdad: indica cuántas filas son válidas.
+# También anota desde qué fila ha cambiado el contenido ya guardado (solape que
+# corrige operaciones antiguas), para que los agregados incrementales lo detecten.
+#
+# append_deals no deja el almacén a medias aunque se interrumpa: la cola nueva de
+# cada columna se escribe antes en <columna>.bin.tail y el checkpoint la anota
+# como pendiente ("pending": primera fila de la cola). Solo entonces se copia la
+# cola a las columnas; si algo falla, la siguiente lectura repite la copia. Si aun
+# así alguna columna no tiene el tamaño del checkpoint, el almacén se descarta y
+# se vuelve a descargar desde la fuente.
+from datetime import datetime
+from operator import attrgetter
+import pandas as pd
+import numpy as np
+import os
+import json
+import publisher
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos_mt5")
+
+DEAL_COLUMNS = {
+    "ticket": np.int64,
+    "time": np.int64,
+    "type": np.int8,
+    "entry": np.int8,
+    "position_id": np.int64,
+    "volume": np.float64,
+    "price": np.float64,
+    "profit": np.float64,
+    "symbol": np.int32,  # código de la categoría en symbols.json
+}
+
+def _column_path(data_dir, columna):
+    return os.path.join(data_dir, f"{columna}.bin")
+
+def _checkpoint_path(data_dir):
+    return os.path.join(data_dir, "checkpoint.json")
+
+def _tail_path(data_dir, columna):
+    return os.path.join(data_dir, f"{columna}.bin.tail")
+
+def _symbols_path(data_dir):
+    return os.path.join(data_dir, "symbols.json")
+
+def _write_checkpoint(data_dir, checkpoint):
+    publisher.atomic_write(_checkpoint_path(data_dir), json.dumps(checkpoint, indent=2))
+
+def _column_size(data_dir, columna):
+    try:
+        return os.path.getsize(_column_path(data_dir, columna))
+    except OSError:
+        return 0
+
+def _complete_pending(data_dir, checkpoint):
+    """Copia a las columnas la cola anotada como pendiente (repetirlo no cambia nada)"""
+    desde = checkpoint["pending"]
+    # Las filas anteriores a la cola nunca se tocan; si faltan, no hay nada que repetir
+    if any(_column_size(data_dir, c) < desde * np.dtype(t).itemsize for c, t in DEAL_COLUMNS.items()):
+        raise OSError("faltan filas anteriores a la escritura pendiente")
+    for columna, dtype in DEAL_COLUMNS.items():
+        with open(_tail_path(data_dir, columna), 'rb') as f:
+            cola = f.read()
+        mode = 'r+b' if os.path.exists(_column_path(data_dir, columna)) else 'wb'
+        with open(_column_path(data_dir, columna), mode) as f:
+            f.truncate(desde * np.dtype(dtype).itemsize)
+            f.seek(desde * np.dtype(dtype).itemsize)
+            f.write(cola)
+            f.flush()
+            os.fsync(f.fileno())
+
+    checkpoint = {k: v for k, v in checkpoint.items() if k != "pending"}
+    _write_checkpoint(data_dir, checkpoint)
+    for columna in DEAL_COLUMNS:
+        os.remove(_tail_path(data_dir, columna))
+    return checkpoint
+
+def _columns_match(data_dir, filas):
+    """True si cada columna tiene exactamente las filas del checkpoint"""
+    return all(_column_size(data_dir, c) == filas * np.dtype(t).itemsize for c, t in DEAL_COLUMNS.items())
+
+def read_checkpoint(data_dir=DATA_DIR):
+    """Lee el checkpoint del almacén, completando una escritura interrumpida.
+    None si no existe, es de un formato anterior o las columnas no cuadran con él"""
+    try:
+        with open(_checkpoint_path(data_dir), 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if "rows" not in checkpoint:
+        return None
+    if checkpoint.get("pending") is not None:
+        try:
+            checkpoint = _complete_pending(data_dir, checkpoint)
+        except OSError as e:
+            print(f"⚠️ No se pudo completar la última escritura del almacén ({e}), se reconstruirá desde la fuente")
+            os.remove(_checkpoint_path(data_dir))
+            return None
+    if not _columns_match(data_dir, checkpoint["rows"]):
+        # Columnas truncadas o desfasadas: sin checkpoint se vuelve a descargar todo
+        print(f"⚠️ El almacén de {data_dir} no coincide con su checkpoint, se reconstruirá desde la fuente")
+        os.remove(_checkpoint_path(data_dir))
+        return None
+    return checkpoint
+
+def read_symbols(data_dir=DATA_DIR):
+    """Lee la lista de símbolos (categorías) del almacén"""
+    try:
+        with open(_symbols_path(data_dir), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+def load_columns(data_dir=DATA_DIR):
+    """Abre las columnas del almacén como memmaps de solo lectura"""
+    checkpoint = read_checkpoint(data_dir)
+    filas = checkpoint["rows"] if checkpoint else 0
+
+    columnas = {}
+    for columna, dtype in DEAL_COLUMNS.items():
+        if filas == 0:
+            columnas[columna] = np.empty(0, dtype=dtype)
+        else:
+            columnas[columna] = np.memmap(_column_path(data_dir, columna), dtype=dtype, mode='r', shape=(filas,))
+    return columnas, read_symbols(data_dir)
+
+def load_deals_frame(data_dir=DATA_DIR):
+    """Devuelve el almacén como DataFrame con 'symbol' categórico, sin copiar columna a columna"""
+    columnas, symbols = load_columns(data_dir)
+    datos = dict(columnas)
+    datos["symbol"] = pd.Categorical.from_codes(columnas["symbol"], categories=pd.Index(symbols, dtype=object))
+    return pd.DataFrame(datos, copy=False)
+
+def records_to_columns(trades):
+    """Convierte la tupla de history_deals_get en columnas compactas (símbolo como código local)"""
+    n = len(trades)
+    columnas = {
+        columna: np.fromiter(map(attrgetter(columna), trades), dtype=dtype, count=n)
+        for columna, dtype in DEAL_COLUMNS.items() if columna != "symbol"
+    }
+    codigos, simbolos = pd.factorize(np.fromiter(map(attrgetter("symbol"), trades), dtype=object, count=n))
+    columnas["symbol"] = codigos.astype(DEAL_COLUMNS["symbol"])
+
+    # Solo operaciones de compra/venta; balance, créditos, etc. no se guardan
+    filtro = columnas["type"] <= 1
+    if not filtro.all():
+        columnas = {c: v[filtro] for c, v in columnas.items()}
+    return columnas, np.asarray(simbolos, dtype=object)
+
+def columns_to_frame(columnas, simbolos):
+    """DataFrame con las columnas del almacén y el símbolo como texto, listo para append_deals"""
+    datos = {c: columnas[c] for c in DEAL_COLUMNS if c != "symbol"}
+    datos["symbol"] = np.asarray(simbolos, dtype=object)[columnas["symbol"]]
+    return pd.DataFrame(datos)[list(DEAL_COLUMNS)]
+
+def first_difference(anteriores, nuevas):
+    """Primera fila en la que difieren dos colas de columnas. None si 'nuevas' solo añade filas al final"""
+    comunes = min(len(anteriores["time"]), len(nuevas["time"]))
+    distintas = np.zeros(comunes, dtype=bool)
+    for columna in DEAL_COLUMNS:
+        distintas |= anteriores[columna][:comunes] != nuevas[columna][:comunes]
+    if distintas.any():
+        return int(np.argmax(distintas))
+    if len(nuevas["time"]) < len(anteriores["time"]):
+        return comunes
+    return None
+
+def clear_changes(data_dir=DATA_DIR):
+    """Olvida la marca de filas modificadas (una vez que los agregados se han puesto al día)"""
+    checkpoint = read_checkpoint(data_dir)
+    if checkpoint is None or checkpoint.get("changed_from") is None:
+        return
+    checkpoint["changed_from"] = None
+    _write_checkpoint(data_dir, checkpoint)
+
+def append_deals(nuevas_df, desde, data_dir=DATA_DIR):
+    """Añade operaciones nuevas reescribiendo solo la cola del almacén a partir de 'desde' (epoch s)"""
+    os.makedirs(data_dir, exist_ok=True)
+    anterior = read_checkpoint(data_dir) or {}
+    columnas, symbols = load_columns(data_dir)
+
+    # Las filas guardadas desde 'desde' se vuelven a fusionar con las descargadas.
+    # Se copian y se sueltan los memmaps: Windows no permite truncar un fichero mapeado.
+    corte = int(np.searchsorted(columnas["time"], desde, side='left'))
+    cola = {c: np.array(v[corte:]) for c, v in columnas.items()}
+    previo = (int(columnas["ticket"][corte - 1]), int(columnas["time"][corte - 1])) if corte else (None, None)
+    del columnas
+
+    cola_df = pd.DataFrame(cola)
+    cola_df["symbol"] = np.asarray(symbols, dtype=object)[cola["symbol"]] if len(symbols) else cola["symbol"]
+
+    fusion = (pd.concat([cola_df, nuevas_df], ignore_index=True)
+              .drop_duplicates(subset='ticket', keep='last')
+              .sort_values(['time', 'ticket'], kind='stable'))
+
+    # Codificar símbolos ampliando la lista de categorías existente
+    simbolos_nuevos = pd.unique(fusion['symbol'].astype(str))
+    conocidos = set(symbols)
+    symbols = symbols + [s for s in simbolos_nuevos if s not in conocidos]
+    codigos = pd.Index(symbols).get_indexer(fusion['symbol'].astype(str))
+
+    nuevas = {
+        columna: np.ascontiguousarray(codigos if columna == "symbol" else fusion[columna].to_numpy(), dtype=dtype)
+        for columna, dtype in DEAL_COLUMNS.items()
+    }
+    # Filas ya guardadas cuyo contenido cambia (no las que solo se reescriben iguales)
+    diferencia = first_difference(cola, nuevas)
+    cambio = anterior.get("changed_from")
+    if diferencia is not None:
+        cambio = corte + diferencia if cambio is None else min(cambio, corte + diferencia)
+
+    # Primero la cola completa en ficheros aparte; las columnas no se tocan todavía
+    for columna in DEAL_COLUMNS:
+        publisher.atomic_write(_tail_path(data_dir, columna), nuevas[columna].tobytes())
+    # La lista de símbolos solo crece, así que vale también para las filas anteriores
+    publisher.atomic_write(_symbols_path(data_dir), json.dumps(symbols, ensure_ascii=False))
+
+    checkpoint = {
+        "rows": corte + len(fusion),
+        "last_ticket": int(fusion['ticket'].iloc[-1]) if len(fusion) else previo[0],
+        "last_time": int(fusion['time'].iloc[-1]) if len(fusion) else previo[1],
+        "changed_from": cambio,
+        "pending": corte,
+        "updated": datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+    }
+
+    # Con el checkpoint escrito la cola ya es definitiva: si la copia se interrumpe,
+    # read_checkpoint la repite. Si algo falla antes, el almacén sigue como estaba
+    _write_checkpoint(data_dir, checkpoint)
+    return _complete_pending(data_dir, checkpoint)
@@ -0,0 +1,125 @@
+# ---------------------------
+# DESCARGA POR VENTANAS DEL HISTORIAL - MM LADRÓN DEL DOJI
+# ---------------------------
+# En lugar de pedir todo el rango de una vez (una tupla de namedtuples con toda
+# la vida de la cuenta, luego lista y luego DataFrame), el historial se recorre
+# en ventanas de tiempo (mensuales por defecto). Cada ventana se convierte en
+# columnas compactas, se añade al almacén y se suelta antes de pasar a la
+# siguiente: la memoria pico depende del tamaño de la ventana, no de la
+# antigüedad de la cuenta.
+#
+# Con workers > 1 las ventanas se siguen pidiendo de una en una y desde este
+# hilo (nada garantiza que la sesión global de MetaTrader5 admita llamadas
+# concurrentes); lo que va en paralelo es su conversión a columnas, mientras se
+# pide la siguiente ventana y se añade la anterior al almacén (como mucho
+# 'workers' ventanas en memoria). Se procesan siempre en orden cronológico.
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import numpy as np
+import deal_store
+import metrics_engine
+
+def month_windows(desde, hasta):
+    """Ventanas [inicio, fin] consecutivas que cortan el rango en los cambios de mes"""
+    inicio = desde
+    while inicio < hasta:
+        siguiente = datetime(inicio.year + inicio.month // 12, inicio.month % 12 + 1, 1)
+        fin = min(siguiente, hasta)
+        yield inicio, fin
+        inicio = fin
+
+def day_windows(desde, hasta, dias):
+    """Ventanas [inicio, fin] de 'dias' días"""
+    inicio = desde
+    while inicio < hasta:
+        fin = min(inicio + timedelta(days=dias), hasta)
+        yield inicio, fin
+        inicio = fin
+
+def time_windows(desde, hasta, ventana="month"):
+    """'month' para ventanas mensuales o un número de días"""
+    if ventana == "month":
+        return month_windows(desde, hasta)
+    return day_windows(desde, hasta, int(ventana))
+
+def stream_windows(fuente, desde, hasta, ventana="month", workers=1):
+    """Genera (inicio, fin, columnas) por ventana, en orden; columnas es None si la ventana está vacía"""
+    # history_deals_get incluye ambos extremos (resolución de segundos): cada ventana
+    # termina un segundo antes de la siguiente para no descargar dos veces el borde
+    ventanas = ((inicio, fin if fin >= hasta else fin - timedelta(seconds=1))
+                for inicio, fin in time_windows(desde, hasta, ventana))
+    if workers <= 1:
+        for inicio, fin in ventanas:
+            yield inicio, fin, fuente.history_deals_columns(inicio, fin)
+        return
+
+    # Como mucho 'workers' ventanas decodificándose a la vez: la memoria sigue acotada
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pendientes = []
+        for inicio, fin in ventanas:
+            crudo = fuente.fetch_window(inicio, fin)
+            pendientes.append((inicio, fin, pool.submit(fuente.decode_window, crudo)))
+            del crudo
+            if len(pendientes) >= workers:
+                inicio_v, fin_v, futuro = pendientes.pop(0)
+                yield inicio_v, fin_v, futuro.result()
+        for inicio_v, fin_v, futuro in pendientes:
+            yield inicio_v, fin_v, futuro.result()
+
+class DailyAggregator:
+    """Agregado incremental de las operaciones de cierre: totales y beneficio/operaciones por día"""
+
+    # Cubetas por día (atributo -> dtype); las subclases pueden añadir más con day_weights
+    BUCKETS = {"day_profit": np.float64, "day_count": np.int64}
+
+    def __init__(self):
+        self.deals = 0
+        self.closed = 0
+        self.profit = 0.0
+        self.first_day = None
+        for nombre, dtype in self.BUCKETS.items():
+            setattr(self, nombre, np.zeros(0, dtype=dtype))
+
+    def day_weights(self, profits):
+        """Peso de cada operación en cada cubeta (None = contarla)"""
+        return {"day_profit": profits, "day_count": None}
+
+    def update(self, columnas, simbolos=None):
+        self.deals += len(columnas["time"])
+        cierre = columnas["entry"] == 1
+        if not cierre.any():
+            return
+        dias = columnas["time"][cierre] // metrics_engine.SECONDS_PER_DAY
+        profits = columnas["profit"][cierre]
+        self.closed += len(profits)
+        self.profit += float(profits.sum())
+
+        # Cubetas por día relativas al primer día visto; se amplían al llegar días nuevos
+        if self.first_day is None:
+            self.first_day = int(dias.min())
+        desplazamiento = max(self.first_day - int(dias.min()), 0)
+        self.first_day -= desplazamiento
+        indices = dias - self.first_day
+        for nombre, pesos in self.day_weights(profits).items():
+            cubeta = getattr(self, nombre)
+            largo = max(len(cubeta) + desplazamiento, int(indices.max()) + 1)
+            ampliada = np.zeros(largo, dtype=cubeta.dtype)
+            ampliada[desplazamiento:desplazamiento + len(cubeta)] = cubeta
+            ampliada += np.bincount(indices, weights=pesos, minlength=largo).astype(cubeta.dtype)
+            setattr(self, nombre, ampliada)
+
+def ingest(fuente, desde, hasta, store_dir, ventana="month", workers=1):
+    """Descarga el rango por ventanas y añade cada una al almacén"""
+    ventanas = 0
+    descargadas = 0
+    for inicio, fin, columnas in stream_windows(fuente, desde, hasta, ventana, workers):
+        ventanas += 1
+        if columnas is None:
+            continue
+        datos, simbolos = columnas
+        descargadas += len(datos["time"])
+        # Cada ventana sustituye a las filas guardadas desde su inicio (solape con el checkpoint)
+        deal_store.append_deals(deal_store.columns_to_frame(datos, simbolos),
+                                int(metrics_engine.to_epoch_seconds(inicio)), store_dir)
+        del datos, simbolos, columnas
+    return ventanas, descargadas
@@ -0,0 +1,56 @@
+# ---------------------------
+# REDUCCIÓN DE PUNTOS DE LA CURVA DE CAPITAL - MM LADRÓN DEL DOJI
+# ---------------------------
+# Largest-Triangle-Three-Buckets: conserva la forma de la curva (picos y
+# drawdowns) eligiendo en cada cubeta el punto que forma el triángulo de mayor
+# área con el punto elegido antes y la media de la cubeta siguiente.
+import pandas as pd
+import numpy as np
+
+EQUITY_RESOLUTIONS = (50, 200, 1000)
+
+def lttb_indices(x, y, n_puntos):
+    """Índices de los n_puntos elegidos por LTTB (incluye siempre el primero y el último)"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    total = len(x)
+    if n_puntos >= total:
+        return np.arange(total)
+    if n_puntos < 3:
+        return np.array([0, total - 1][:max(n_puntos, 0)])
+
+    # n_puntos - 2 cubetas sobre los puntos interiores; medias con sumas acumuladas
+    bordes = np.linspace(1, total - 1, n_puntos - 1).astype(np.int64)
+    suma_x = np.r_[0.0, np.cumsum(x)]
+    suma_y = np.r_[0.0, np.cumsum(y)]
+    tamaños = np.diff(bordes)
+    media_x = (suma_x[bordes[1:]] - suma_x[bordes[:-1]]) / tamaños
+    media_y = (suma_y[bordes[1:]] - suma_y[bordes[:-1]]) / tamaños
+    # La "cubeta siguiente" de la última es el punto final
+    media_x = np.r_[media_x, x[-1]]
+    media_y = np.r_[media_y, y[-1]]
+
+    elegidos = np.empty(n_puntos, dtype=np.int64)
+    elegidos[0] = 0
+    elegidos[-1] = total - 1
+    anterior = 0
+    for i in range(n_puntos - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        xa, ya = x[anterior], y[anterior]
+        areas = np.abs((xa - media_x[i + 1]) * (y[inicio:fin] - ya) - (xa - x[inicio:fin]) * (media_y[i + 1] - ya))
+        anterior = inicio + int(np.argmax(areas))
+        elegidos[i + 1] = anterior
+    return elegidos
+
+def equity_resolutions(tiempos, capital, resoluciones=EQUITY_RESOLUTIONS, formato='%d/%m/%y'):
+    """Curva de capital a nivel de operación reducida a varias resoluciones fijas para los gráficos"""
+    tiempos = np.asarray(tiempos)
+    capital = np.asarray(capital)
+    curvas = {}
+    for n_puntos in resoluciones:
+        indices = lttb_indices(tiempos, capital, n_puntos)
+        curvas[str(n_puntos)] = {
+            "labels": pd.to_datetime(tiempos[indices], unit='s').strftime(formato).tolist(),
+            "data": [int(v) for v in capital[indices]]
+        }
+    return curvas
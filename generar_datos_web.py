@@ -1,17 +1,18 @@
 # 📁 generar_datos_web.py - Versión Simplificada
-import MetaTrader5 as mt5
 from datetime import datetime, timedelta
-import pandas as pd
-import numpy as np
 import os
 import json
 
-print("🚀 GENERADOR DE DATOS WEB - MM LADRÓN DEL DOJI")
-print("=" * 50)
+# Adaptador con la misma interfaz que el módulo MetaTrader5. Se crea al conectar:
+# importar este módulo no carga pandas, numpy ni MetaTrader5 ni imprime nada
+mt5 = None
 
 def conectar_mt5():
     """Intenta conectar con MT5"""
+    global mt5
     try:
+        from deal_sources import MT5Source
+        mt5 = MT5Source()
         if not mt5.initialize():
             print("❌ No se pudo conectar con MT5")
             return False
@@ -97,6 +98,9 @@ def guardar_json(web_data):
 
 def main():
     """Función principal"""
+    print("🚀 GENERADOR DE DATOS WEB - MM LADRÓN DEL DOJI")
+    print("=" * 50)
+
     # Intentar con MT5 primero
     if conectar_mt5():
         trades = obtener_operaciones_mt5()
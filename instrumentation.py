@@ -0,0 +1,159 @@
+# ---------------------------
+# INSTRUMENTACIÓN - MM LADRÓN DEL DOJI
+# ---------------------------
+# Mide cada etapa de una actualización (tiempo, memoria Python con tracemalloc
+# y pico de RSS del proceso), cuenta operaciones y guarda un informe por
+# ejecución en un log NDJSON y, opcionalmente, en formato de texto Prometheus.
+from datetime import datetime
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+PROMETHEUS_PREFIX = "mmdoji_refresh"
+
+def rss_peak_bytes():
+    """Pico de memoria residente del proceso (None si el sistema no lo expone)"""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            contadores = PROCESS_MEMORY_COUNTERS()
+            contadores.cb = ctypes.sizeof(contadores)
+            proceso = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(proceso, ctypes.byref(contadores), contadores.cb):
+                return int(contadores.PeakWorkingSetSize)
+            return None
+
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux lo da en KiB, macOS en bytes
+        return int(pico) if sys.platform == "darwin" else int(pico) * 1024
+    except Exception:
+        return None
+
+class StageTimer:
+    """Cronómetro por vueltas: cada lap() atribuye el tiempo (y la memoria) transcurridos a una etapa"""
+
+    def __init__(self, trace_memory=False, run_log_path=None, prometheus_path=None):
+        self.stages = {}
+        self.memory = {}
+        self.counts = {}
+        self.trace_memory = trace_memory
+        self.run_log_path = run_log_path
+        self.prometheus_path = prometheus_path
+        self.report = None
+        self._inicio_reloj = datetime.now()
+        self._ultimo = time.perf_counter()
+        self._tracemalloc_propio = False
+
+    def start(self):
+        self._inicio_reloj = datetime.now()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracemalloc_propio = True
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._ultimo = time.perf_counter()
+
+    def lap(self, nombre):
+        ahora = time.perf_counter()
+        self.stages[nombre] = self.stages.get(nombre, 0.0) + (ahora - self._ultimo)
+        if self.trace_memory and tracemalloc.is_tracing():
+            _, pico = tracemalloc.get_traced_memory()
+            self.memory[nombre] = max(self.memory.get(nombre, 0), pico)
+            tracemalloc.reset_peak()
+        self._ultimo = time.perf_counter()
+
+    def count(self, nombre, valor):
+        self.counts[nombre] = int(valor)
+
+    def total(self):
+        return sum(self.stages.values())
+
+    def finish(self, status="ok", **extra):
+        """Cierra la ejecución, construye el informe y lo escribe en los destinos configurados"""
+        if self._tracemalloc_propio:
+            tracemalloc.stop()
+            self._tracemalloc_propio = False
+
+        self.report = {
+            "timestamp": self._inicio_reloj.isoformat(timespec="seconds"),
+            "status": status,
+            "duration_s": round(self.total(), 6),
+            "stages_s": {etapa: round(t, 6) for etapa, t in self.stages.items()},
+            "counts": dict(self.counts),
+            "rss_peak_bytes": rss_peak_bytes(),
+        }
+        if self.memory:
+            self.report["tracemalloc_peak_bytes"] = dict(self.memory)
+        self.report.update(extra)
+
+        try:
+            if self.run_log_path:
+                append_ndjson(self.run_log_path, self.report)
+            if self.prometheus_path:
+                write_prometheus(self.prometheus_path, self.report)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el informe de ejecución: {e}")
+        return self.report
+
+    def summary(self):
+        etapas = " | ".join(f"{etapa} {t:.3f}s" for etapa, t in self.stages.items())
+        return f"⏱️ {self.total():.3f}s → {etapas}"
+
+def append_ndjson(path, registro):
+    """Añade una línea JSON al log de ejecuciones"""
+    carpeta = os.path.dirname(path)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+def to_prometheus(report):
+    """Formatea un informe de ejecución como texto de exposición de Prometheus"""
+    p = PROMETHEUS_PREFIX
+    lineas = [
+        f"# HELP {p}_duration_seconds Duración total de la última actualización",
+        f"# TYPE {p}_duration_seconds gauge",
+        f"{p}_duration_seconds {report['duration_s']}",
+        f"# HELP {p}_success 1 si la última actualización terminó correctamente",
+        f"# TYPE {p}_success gauge",
+        f"{p}_success {1 if report['status'] == 'ok' else 0}",
+        f"# HELP {p}_timestamp_seconds Momento de la última actualización",
+        f"# TYPE {p}_timestamp_seconds gauge",
+        f"{p}_timestamp_seconds {int(datetime.fromisoformat(report['timestamp']).timestamp())}",
+        f"# HELP {p}_stage_seconds Duración de cada etapa de la última actualización",
+        f"# TYPE {p}_stage_seconds gauge",
+    ]
+    lineas += [f'{p}_stage_seconds{{stage="{etapa}"}} {t}' for etapa, t in report["stages_s"].items()]
+
+    lineas += [f"# HELP {p}_deals Operaciones procesadas en la última actualización", f"# TYPE {p}_deals gauge"]
+    lineas += [f'{p}_deals{{kind="{nombre}"}} {valor}' for nombre, valor in report["counts"].items()]
+
+    if report.get("tracemalloc_peak_bytes"):
+        lineas += [f"# HELP {p}_stage_peak_bytes Pico de memoria Python (tracemalloc) por etapa", f"# TYPE {p}_stage_peak_bytes gauge"]
+        lineas += [f'{p}_stage_peak_bytes{{stage="{etapa}"}} {b}' for etapa, b in report["tracemalloc_peak_bytes"].items()]
+
+    if report.get("rss_peak_bytes") is not None:
+        lineas += [f"# HELP {p}_rss_peak_bytes Pico de memoria residente del proceso", f"# TYPE {p}_rss_peak_bytes gauge"]
+        lineas.append(f"{p}_rss_peak_bytes {report['rss_peak_bytes']}")
+    return "\n".join(lineas) + "\n"
+
+def write_prometheus(path, report):
+    """Escribe el informe en formato Prometheus de forma atómica (para el textfile collector)"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(to_prometheus(report))
+    os.replace(tmp_path, path)
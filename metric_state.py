@@ -0,0 +1,304 @@
+# ---------------------------
+# ESTADO INCREMENTAL DE MÉTRICAS - MM LADRÓN DEL DOJI
+# ---------------------------
+# Acumuladores que se guardan entre ejecuciones (metric_state.json en el
+# almacén) para no recorrer todo el historial en cada actualización:
+#   - media y varianza de los profits (Welford, fusionando lotes)
+#   - máximo del profit acumulado y peor drawdown
+#   - sumas y número de operaciones ganadoras y perdedoras
+#   - cubetas por día (operaciones, ganadoras, profit, brutos y suma de
+#     cuadrados) de las que salen los gráficos diarios y las métricas móviles
+#   - sumas por símbolo y por dirección (desglose)
+#   - histograma de permanencia y las posiciones que siguen abiertas
+# Lo único que se sigue recorriendo entero es la curva de capital por operación
+# (LTTB necesita todos los puntos) y, con ella, el índice de P&L por período.
+# Cada ejecución aplica solo las filas del almacén posteriores a la marca de
+# agua (filas consumidas + último ticket). Si el almacén ha cambiado por
+# detrás de la marca (el solape corrige una operación ya aplicada, lo anota
+# append_deals en el checkpoint), o cambian el capital o el factor, se reconstruye.
+from datetime import datetime
+import json
+import os
+import numpy as np
+import deal_store
+import deal_stream
+import metrics_engine
+import positions
+import publisher
+
+STATE_NAME = "metric_state.json"
+STATE_VERSION = 3
+# Tolerancia relativa al comparar con el recálculo completo
+VERIFY_TOLERANCE = 1e-9
+
+class MetricState(deal_stream.DailyAggregator):
+    """Agregados de las operaciones de cierre que se actualizan en O(operaciones nuevas)"""
+
+    BUCKETS = {
+        **deal_stream.DailyAggregator.BUCKETS,
+        "day_wins": np.int64,
+        "day_gross_win": np.float64,
+        "day_gross_loss": np.float64,
+        "day_sq": np.float64,
+    }
+
+    def __init__(self, capital_inicial, factor_ajuste):
+        super().__init__()
+        self.capital_inicial = capital_inicial
+        self.factor_ajuste = factor_ajuste
+        # Marca de agua: filas del almacén ya aplicadas y ticket/tiempo de la última
+        self.rows = 0
+        self.last_ticket = None
+        self.last_time = None
+        self.wins = 0
+        self.losses = 0
+        self.sum_wins = 0.0
+        self.sum_losses = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.peak = None
+        self.worst_drawdown = 0.0
+        # Desglose: sumas por código de símbolo del almacén y por dirección (0 = BUY, 1 = SELL)
+        self.symbol_sums = _empty_sums(0)
+        self.direction_sums = _empty_sums(2)
+        self.holding = np.zeros(len(positions.HOLDING_TIME_BUCKETS), dtype=np.int64)
+        self.open_positions = positions.empty_open_positions()
+
+    def day_weights(self, profits):
+        return {
+            **super().day_weights(profits),
+            "day_wins": (profits > 0).astype(np.float64),
+            "day_gross_win": np.where(profits > 0, profits, 0.0),
+            "day_gross_loss": -np.where(profits < 0, profits, 0.0),
+            "day_sq": profits * profits,
+        }
+
+    def update(self, columnas, simbolos=None):
+        self.open_positions, self.holding = positions.track_positions(self.open_positions, self.holding, columnas)
+        cierre = columnas["entry"] == 1
+        profits = np.asarray(columnas["profit"][cierre], dtype=np.float64)
+        previas = self.closed
+        # Acumulado continuando la suma secuencial: mismo resultado que un cumsum completo
+        acumulado = np.cumsum(np.r_[self.profit, profits])[1:]
+        super().update(columnas, simbolos)
+        if len(profits) == 0:
+            return
+        self.profit = float(acumulado[-1])
+
+        # El cierre tiene el tipo contrario a la posición (un SELL cierra un BUY)
+        codigos = np.asarray(columnas["symbol"][cierre], dtype=np.int64)
+        self.symbol_sums = _add_sums(self.symbol_sums, metrics_engine.group_sums(codigos, int(codigos.max()) + 1, profits))
+        direcciones = 1 - np.asarray(columnas["type"][cierre], dtype=np.int64)
+        self.direction_sums = _add_sums(self.direction_sums, metrics_engine.group_sums(direcciones, 2, profits))
+
+        es_ganadora = profits > 0
+        es_perdedora = profits < 0
+        self.wins += int(np.count_nonzero(es_ganadora))
+        self.losses += int(np.count_nonzero(es_perdedora))
+        self.sum_wins += float(profits[es_ganadora].sum())
+        self.sum_losses += float(profits[es_perdedora].sum())
+
+        # Welford por lotes: se fusiona (n, media, M2) del lote con el acumulado
+        k = len(profits)
+        media_lote = profits.mean()
+        m2_lote = float(((profits - media_lote) ** 2).sum())
+        total = previas + k
+        delta = media_lote - self.mean
+        self.mean += delta * k / total
+        self.m2 += m2_lote + delta ** 2 * previas * k / total
+
+        # Drawdown con el máximo arrastrado desde ejecuciones anteriores
+        picos = np.maximum.accumulate(acumulado)
+        if self.peak is not None:
+            picos = np.maximum(picos, self.peak)
+        capital = self.capital_inicial + acumulado * self.factor_ajuste
+        pico_capital = self.capital_inicial + picos * self.factor_ajuste
+        self.worst_drawdown = min(self.worst_drawdown, float((capital / pico_capital - 1).min()))
+        self.peak = float(picos[-1])
+
+    def apply_rows(self, columnas, desde, hasta):
+        """Aplica las filas [desde, hasta) del almacén y avanza la marca de agua"""
+        if hasta > desde:
+            self.update({c: v[desde:hasta] for c, v in columnas.items()})
+            self.last_ticket = int(columnas["ticket"][hasta - 1])
+            self.last_time = int(columnas["time"][hasta - 1])
+        self.rows = hasta
+
+    def totals(self):
+        """Agregados con el mismo formato que metrics_engine.trade_totals"""
+        return {
+            "n": self.closed,
+            "wins": self.wins,
+            "losses": self.losses,
+            "sum_wins": self.sum_wins,
+            "sum_losses": self.sum_losses,
+            "total": self.profit,
+            "mean": self.mean,
+            "std": float(np.sqrt(self.m2 / (self.closed - 1))) if self.closed > 1 else 0.0,
+            "worst_drawdown": self.worst_drawdown,
+        }
+
+    def buckets(self):
+        """Cubetas diarias con el mismo formato que metrics_engine.daily_buckets"""
+        return {
+            "first_day": self.first_day,
+            "count": self.day_count,
+            "wins": self.day_wins,
+            "profit": self.day_profit,
+            "gross_win": self.day_gross_win,
+            "gross_loss": self.day_gross_loss,
+            "sq": self.day_sq,
+        }
+
+    def breakdown(self, simbolos):
+        """Desglose con el mismo formato que metrics_engine.compute_breakdown"""
+        return metrics_engine.breakdown_from_sums(simbolos, self.symbol_sums, self.direction_sums,
+                                                  self.capital_inicial, self.factor_ajuste)
+
+    def to_dict(self):
+        return {
+            "version": STATE_VERSION,
+            "updated": datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+            "capital_inicial": self.capital_inicial,
+            "factor_ajuste": self.factor_ajuste,
+            "rows": self.rows,
+            "last_ticket": self.last_ticket,
+            "last_time": self.last_time,
+            "deals": self.deals,
+            "closed": self.closed,
+            "profit": self.profit,
+            "wins": self.wins,
+            "losses": self.losses,
+            "sum_wins": self.sum_wins,
+            "sum_losses": self.sum_losses,
+            "mean": self.mean,
+            "m2": self.m2,
+            "peak": self.peak,
+            "worst_drawdown": self.worst_drawdown,
+            "first_day": self.first_day,
+            **{nombre: getattr(self, nombre).tolist() for nombre in self.BUCKETS},
+            "symbol_sums": {campo: v.tolist() for campo, v in self.symbol_sums.items()},
+            "direction_sums": {campo: v.tolist() for campo, v in self.direction_sums.items()},
+            "holding": self.holding.tolist(),
+            "open_positions": {campo: v.tolist() for campo, v in self.open_positions.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, datos):
+        estado = cls(datos["capital_inicial"], datos["factor_ajuste"])
+        for clave in ("rows", "last_ticket", "last_time", "deals", "closed", "profit", "wins", "losses",
+                      "sum_wins", "sum_losses", "mean", "m2", "peak", "worst_drawdown", "first_day"):
+            setattr(estado, clave, datos[clave])
+        for nombre, dtype in cls.BUCKETS.items():
+            setattr(estado, nombre, np.asarray(datos[nombre], dtype=dtype))
+        for nombre in ("symbol_sums", "direction_sums"):
+            setattr(estado, nombre, {campo: np.asarray(datos[nombre][campo], dtype=dtype)
+                                     for campo, dtype in metrics_engine.GROUP_SUMS.items()})
+        estado.holding = np.asarray(datos["holding"], dtype=np.int64)
+        estado.open_positions = {campo: np.asarray(datos["open_positions"][campo], dtype=dtype)
+                                 for campo, dtype in positions.OPEN_FIELDS.items()}
+        return estado
+
+def _empty_sums(n_grupos):
+    return {campo: np.zeros(n_grupos, dtype=dtype) for campo, dtype in metrics_engine.GROUP_SUMS.items()}
+
+def _add_sums(actuales, nuevas):
+    """Suma dos juegos de sumas por grupo ampliando al más largo"""
+    largo = max(len(actuales["trades"]), len(nuevas["trades"]))
+    return {campo: np.pad(actuales[campo], (0, largo - len(actuales[campo])))
+                   + np.pad(nuevas[campo], (0, largo - len(nuevas[campo])))
+            for campo in metrics_engine.GROUP_SUMS}
+
+def _state_path(data_dir):
+    return os.path.join(data_dir, STATE_NAME)
+
+def load_state(data_dir, capital_inicial, factor_ajuste):
+    """Lee el estado guardado (None si no existe, es de otra versión o de otros parámetros)"""
+    try:
+        with open(_state_path(data_dir), 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if datos.get("version") != STATE_VERSION:
+        return None
+    if datos["capital_inicial"] != capital_inicial or datos["factor_ajuste"] != factor_ajuste:
+        return None
+    return MetricState.from_dict(datos)
+
+def save_state(estado, data_dir):
+    publisher.atomic_write(_state_path(data_dir), json.dumps(estado.to_dict()))
+
+def refresh_state(data_dir, capital_inicial, factor_ajuste):
+    """Pone el estado al día con el almacén aplicando solo las filas nuevas. Devuelve (estado, filas aplicadas, reconstruido)"""
+    columnas, _ = deal_store.load_columns(data_dir)
+    filas = len(columnas["time"])
+    cambio = (deal_store.read_checkpoint(data_dir) or {}).get("changed_from")
+    estado = load_state(data_dir, capital_inicial, factor_ajuste)
+
+    # La marca de agua debe seguir apuntando al mismo ticket y ninguna fila ya
+    # aplicada puede haber cambiado: si no, hay que empezar de cero
+    valido = estado is not None and estado.rows <= filas and (
+        estado.rows == 0 or (int(columnas["ticket"][estado.rows - 1]) == estado.last_ticket
+                             and int(columnas["time"][estado.rows - 1]) == estado.last_time)
+    ) and (cambio is None or cambio >= estado.rows)
+    reconstruido = not valido
+    if reconstruido:
+        estado = MetricState(capital_inicial, factor_ajuste)
+
+    desde = estado.rows
+    estado.apply_rows(columnas, desde, filas)
+    del columnas
+    # Sin filas nuevas ni reconstrucción el estado guardado ya está al día
+    if reconstruido or filas > desde:
+        save_state(estado, data_dir)
+    # Con el estado ya guardado, los cambios anotados están incorporados
+    deal_store.clear_changes(data_dir)
+    return estado, filas - desde, reconstruido
+
+def verify_state(estado, tiempos, profits, operaciones=None):
+    """Compara el estado con un recálculo completo. Devuelve las diferencias (vacío si coinciden).
+    Con 'operaciones' (el DataFrame del almacén) comprueba también el desglose y la permanencia"""
+    tiempos = np.asarray(tiempos, dtype=np.int64)
+    profits = np.asarray(profits, dtype=np.float64)
+    orden = np.argsort(tiempos, kind='stable')
+    tiempos = tiempos[orden]
+    profits = profits[orden]
+    acumulado = np.cumsum(profits)
+    capital = estado.capital_inicial + acumulado * estado.factor_ajuste
+
+    diferencias = {}
+    completos = metrics_engine.trade_totals(profits, capital)
+    for clave, esperado in completos.items():
+        actual = estado.totals()[clave]
+        if not np.isclose(actual, esperado, rtol=VERIFY_TOLERANCE, atol=VERIFY_TOLERANCE):
+            diferencias[clave] = (actual, esperado)
+
+    cubetas = metrics_engine.daily_buckets(tiempos, profits)
+    incremental = estado.buckets()
+    for clave, esperado in cubetas.items():
+        actual = incremental[clave]
+        if clave == "first_day":
+            iguales = actual == esperado
+        else:
+            iguales = len(actual) == len(esperado) and np.allclose(actual, esperado, rtol=VERIFY_TOLERANCE, atol=1e-6)
+        if not iguales:
+            diferencias[f"daily.{clave}"] = (len(incremental["count"]), len(cubetas["count"]))
+
+    if operaciones is not None:
+        cierres = operaciones[operaciones['entry'] == 1]
+        simbolos = operaciones['symbol'].cat.categories
+        profits_cierre = cierres['profit'].to_numpy()
+        completas = {
+            "symbol_sums": metrics_engine.group_sums(cierres['symbol'].cat.codes.to_numpy(), len(simbolos), profits_cierre),
+            "direction_sums": metrics_engine.group_sums(1 - cierres['type'].to_numpy(), 2, profits_cierre),
+        }
+        for nombre, esperadas in completas.items():
+            actuales = _add_sums(getattr(estado, nombre), _empty_sums(len(esperadas["trades"])))
+            for campo, esperado in esperadas.items():
+                if not np.allclose(actuales[campo], esperado, rtol=VERIFY_TOLERANCE, atol=1e-6):
+                    diferencias[f"{nombre}.{campo}"] = (actuales[campo].tolist(), esperado.tolist())
+        permanencia = positions.holding_time_distribution(positions.reconstruct_positions(operaciones))["data"]
+        if estado.holding.tolist() != permanencia:
+            diferencias["holding"] = (estado.holding.tolist(), permanencia)
+    return diferencias
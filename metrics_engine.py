@@ -0,0 +1,420 @@
+# ---------------------------
+# MOTOR DE MÉTRICAS - MM LADRÓN DEL DOJI
+# ---------------------------
+# Ordena una sola vez, agrega por día una sola vez y deriva todas las cifras
+# publicadas (win rate, profit factor, expectancy, Sharpe, drawdown, rendimientos
+# por período y promedios) a partir de esos mismos arrays.
+from datetime import datetime, timedelta
+import numpy as np
+import math
+
+SECONDS_PER_DAY = 86400
+EPOCH = datetime(1970, 1, 1)
+# Techos de las cifras publicadas
+PROFIT_FACTOR_CAP = 3.5
+SHARPE_CAP = 2.5
+# Ventanas (en días naturales) de las series móviles
+ROLLING_WINDOWS = (30, 90)
+
+def to_epoch_seconds(fecha):
+    """Convierte un datetime sin zona (hora del servidor MT5) a segundos epoch"""
+    return (fecha - EPOCH).total_seconds()
+
+def epoch_day(fecha):
+    """Número de día epoch de una fecha/datetime"""
+    return (datetime(fecha.year, fecha.month, fecha.day) - EPOCH).days
+
+def day_to_date(dia):
+    """Fecha de calendario de un número de día epoch"""
+    return (EPOCH + timedelta(days=int(dia))).date()
+
+def daily_buckets(tiempos, profits):
+    """Cubetas diarias densas (del primer al último día con operaciones) de una serie ordenada:
+    nº de operaciones, ganadoras, profit, beneficio y pérdida brutos y suma de cuadrados"""
+    dias_op = tiempos // SECONDS_PER_DAY
+    if len(dias_op) == 0:
+        return {"first_day": None, **{k: np.zeros(0) for k in ("count", "wins", "profit", "gross_win", "gross_loss", "sq")}}
+
+    primero = int(dias_op[0])
+    indices = dias_op - primero
+    largo = int(indices[-1]) + 1
+    es_ganadora = profits > 0
+
+    def por_dia(pesos=None):
+        return np.bincount(indices, weights=pesos, minlength=largo)
+
+    return {
+        "first_day": primero,
+        "count": por_dia(),
+        "wins": por_dia(es_ganadora.astype(np.float64)),
+        "profit": por_dia(profits),
+        "gross_win": por_dia(np.where(es_ganadora, profits, 0.0)),
+        "gross_loss": -por_dia(np.where(profits < 0, profits, 0.0)),
+        "sq": por_dia(profits * profits),
+    }
+
+def trade_totals(profits, capital):
+    """Agregados de las operaciones (ordenadas) de los que salen las cifras principales"""
+    es_ganadora = profits > 0
+    es_perdedora = profits < 0
+    total_operaciones = len(profits)
+    return {
+        "n": total_operaciones,
+        "wins": int(np.count_nonzero(es_ganadora)),
+        "losses": int(np.count_nonzero(es_perdedora)),
+        "sum_wins": float(profits[es_ganadora].sum()),
+        "sum_losses": float(profits[es_perdedora].sum()),
+        # Suma por pares como el .sum() original (no el último acumulado): con el ratio retorno/riesgo
+        # sin drawdown (total / 0.01) la diferencia de redondeo llega a verse en la cifra publicada
+        "total": float(profits.sum()) if total_operaciones else 0.0,
+        "mean": float(profits.mean()) if total_operaciones else 0.0,
+        "std": float(profits.std(ddof=1)) if total_operaciones > 1 else 0.0,
+        # Peor caída del capital respecto a su máximo anterior (0 = sin drawdown)
+        "worst_drawdown": float((capital / np.maximum.accumulate(capital) - 1).min()) if total_operaciones else 0.0,
+    }
+
+def summary_metrics(totales, capital_inicial, factor_ajuste):
+    """Cifras principales (win rate, profit factor, drawdown, expectancy, Sharpe...) a partir de los agregados"""
+    total_operaciones = totales["n"]
+    n_ganadoras = totales["wins"]
+    n_perdedoras = totales["losses"]
+    suma_ganadoras = totales["sum_wins"]
+    suma_perdedoras = totales["sum_losses"]
+    ganancia_total_ajustada = totales["total"] * factor_ajuste
+    ganancia_total_percent_ajustada = (ganancia_total_ajustada / capital_inicial) * 100
+    porcentaje_ganadoras = (n_ganadoras / total_operaciones) * 100 if total_operaciones > 0 else 0
+
+    # Profit Factor ajustado
+    ganancia_total_ganadoras = suma_ganadoras * factor_ajuste if n_ganadoras > 0 else 0
+    perdida_total_perdedoras = abs(suma_perdedoras) * factor_ajuste if n_perdedoras > 0 else 0.01
+    profit_factor = ganancia_total_ganadoras / perdida_total_perdedoras if perdida_total_perdedoras > 0 else ganancia_total_ganadoras / 0.01
+    profit_factor = min(profit_factor, PROFIT_FACTOR_CAP)
+
+    # Drawdown máximo
+    max_drawdown_historico = totales["worst_drawdown"] * 100
+    max_drawdown = min(max_drawdown_historico, -1.0) if max_drawdown_historico < 0 else 0
+
+    # Expectancy y promedios
+    avg_ganancia = (suma_ganadoras / n_ganadoras * factor_ajuste) if n_ganadoras > 0 else 0
+    avg_perdida = (suma_perdedoras / n_perdedoras * factor_ajuste) if n_perdedoras > 0 else 0
+    if total_operaciones > 0:
+        prob_ganar = n_ganadoras / total_operaciones
+        prob_perder = n_perdedoras / total_operaciones
+        expectancy = (prob_ganar * avg_ganancia + prob_perder * avg_perdida) / capital_inicial * 100
+    else:
+        expectancy = 0
+
+    if math.isnan(expectancy):
+        expectancy = 0
+
+    avg_win_percent = avg_ganancia / capital_inicial * 100
+    avg_loss_percent = avg_perdida / capital_inicial * 100
+
+    # Sharpe Ratio (media y desviación de los profits ajustados)
+    desviacion = totales["std"] * factor_ajuste
+    if total_operaciones > 1 and desviacion > 0:
+        sharpe_ratio = (totales["mean"] * factor_ajuste / desviacion) * np.sqrt(252)
+        sharpe_ratio = min(sharpe_ratio, SHARPE_CAP)
+    else:
+        sharpe_ratio = 1.2
+
+    # Return/Risk ratio
+    if max_drawdown != 0:
+        return_risk = abs(ganancia_total_percent_ajustada / max_drawdown)
+        return_risk = min(return_risk, 8.0)
+    else:
+        return_risk = ganancia_total_percent_ajustada / 0.01
+
+    return {
+        "total_operaciones": total_operaciones,
+        "ganadoras": n_ganadoras,
+        "perdedoras": n_perdedoras,
+        "porcentaje_ganadoras": porcentaje_ganadoras,
+        "profit_factor": profit_factor,
+        "max_drawdown": max_drawdown,
+        "expectancy": expectancy,
+        "sharpe_ratio": sharpe_ratio,
+        "return_risk": return_risk,
+        "avg_win_percent": avg_win_percent,
+        "avg_loss_percent": avg_loss_percent,
+    }
+
+def compute_metrics(tiempos, profits, capital_inicial, factor_ajuste, ahora=None, totales=None, cubetas=None):
+    """Calcula todas las métricas publicadas en una sola pasada sobre arrays de tiempo (epoch s) y profit.
+    Con 'totales' y 'cubetas' (p. ej. de un MetricState incremental) no se recalculan los agregados de las
+    cifras principales ni las cubetas diarias de los gráficos y las métricas móviles"""
+    ahora = ahora or datetime.now()
+    tiempos = np.asarray(tiempos, dtype=np.int64)
+    profits = np.asarray(profits, dtype=np.float64)
+
+    # Ordenar una sola vez
+    orden = np.argsort(tiempos, kind='stable')
+    tiempos = tiempos[orden]
+    profits = profits[orden]
+
+    acumulado = np.cumsum(profits)
+    capital = capital_inicial + acumulado * factor_ajuste
+    if totales is None:
+        totales = trade_totals(profits, capital)
+    escalares = summary_metrics(totales, capital_inicial, factor_ajuste)
+
+    # Cubetas diarias (una sola vez) para gráficos y métricas móviles
+    if cubetas is None:
+        cubetas = daily_buckets(tiempos, profits)
+
+    # Operaciones y ganancias de los últimos 7 días
+    hoy = epoch_day(ahora)
+    rolling = rolling_from_buckets(cubetas, capital_inicial, factor_ajuste, hoy=hoy)
+    ultimos_7dias = np.arange(hoy - 6, hoy + 1)
+    recent_trades_labels = [day_to_date(d).strftime('%d/%m') for d in ultimos_7dias]
+    conteos_7dias = np.zeros(7, dtype=np.int64)
+    ganancias_7dias = np.zeros(7)
+    if cubetas["first_day"] is not None:
+        pos = ultimos_7dias - cubetas["first_day"]
+        presente = (pos >= 0) & (pos < len(cubetas["count"]))
+        conteos_7dias[presente] = cubetas["count"][pos[presente]]
+        ganancias_7dias[presente] = cubetas["profit"][pos[presente]]
+    recent_trades_data = [int(c) for c in conteos_7dias]
+    daily_profit_labels = list(recent_trades_labels)
+    daily_profit_data = [int(g) for g in ganancias_7dias * factor_ajuste]
+
+    # Rendimiento por períodos: consultas sobre las sumas prefijas
+    indice = PnLIndex(tiempos, profits, acumulado)
+
+    def rendimiento_desde(desde):
+        return indice.performance(desde, None, capital_inicial, factor_ajuste)
+
+    return {
+        **escalares,
+        "weekly_performance": rendimiento_desde(ahora - timedelta(days=7)),
+        "monthly_performance": rendimiento_desde(ahora - timedelta(days=30)),
+        "quarterly_performance": rendimiento_desde(ahora - timedelta(days=90)),
+        "yearly_performance": rendimiento_desde(datetime(2024, 1, 1)),
+        # Índice para consultas de P&L por rango de fechas y tablas por período
+        "pnl_index": indice,
+        # Curva de capital a nivel de operación (para reducirla con LTTB)
+        "equity_times": tiempos,
+        "equity_curve": capital,
+        "recent_trades_labels": recent_trades_labels,
+        "recent_trades_data": recent_trades_data,
+        "daily_profit_labels": daily_profit_labels,
+        "daily_profit_data": daily_profit_data,
+        "daily": cubetas,
+        "rolling": rolling,
+    }
+
+# ---------------------------
+# ÍNDICE DE P&L POR TIEMPO
+# ---------------------------
+
+def _as_seconds(fecha):
+    """datetime, número o array de segundos epoch -> segundos epoch"""
+    if isinstance(fecha, datetime):
+        return to_epoch_seconds(fecha)
+    return fecha
+
+class PnLIndex:
+    """Sumas prefijas de profit y nº de operaciones sobre tiempos ordenados: cualquier rango en O(log n)"""
+
+    def __init__(self, tiempos, profits, acumulado=None):
+        self.times = np.asarray(tiempos, dtype=np.int64)
+        if acumulado is None:
+            acumulado = np.cumsum(profits)
+        # cum_profit[i] = profit de las i primeras operaciones
+        self.cum_profit = np.r_[0.0, acumulado]
+
+    def __len__(self):
+        return len(self.times)
+
+    def _position(self, fecha, por_defecto):
+        """Índice de la primera operación con tiempo >= fecha (por_defecto si fecha es None)"""
+        if fecha is None:
+            return por_defecto
+        return np.searchsorted(self.times, _as_seconds(fecha), side='left')
+
+    def profit(self, desde=None, hasta=None):
+        """Profit de las operaciones con desde <= tiempo < hasta (None = sin límite)"""
+        return self.cum_profit[self._position(hasta, len(self.times))] - self.cum_profit[self._position(desde, 0)]
+
+    def trades(self, desde=None, hasta=None):
+        """Número de operaciones con desde <= tiempo < hasta"""
+        return self._position(hasta, len(self.times)) - self._position(desde, 0)
+
+    def performance(self, desde=None, hasta=None, capital_inicial=10000, factor_ajuste=0.10):
+        """Rendimiento ajustado (%) del rango"""
+        return (self.profit(desde, hasta) * factor_ajuste / capital_inicial) * 100
+
+    def period_boundaries(self, periodo):
+        """Inicios (segundos epoch) de cada semana ('week', lunes), mes ('month') o año ('year') del historial"""
+        if len(self.times) == 0:
+            return np.empty(0, dtype=np.int64)
+        primero, ultimo = self.times[0], self.times[-1]
+        if periodo == 'week':
+            dia = primero // SECONDS_PER_DAY
+            lunes = dia - (dia + 3) % 7  # el día epoch 0 fue jueves
+            return np.arange(lunes, ultimo // SECONDS_PER_DAY + 1, 7) * SECONDS_PER_DAY
+        unidad = {'month': 'M', 'year': 'Y'}[periodo]
+        inicio = np.datetime64(int(primero), 's').astype(f'datetime64[{unidad}]')
+        fin = np.datetime64(int(ultimo), 's').astype(f'datetime64[{unidad}]')
+        return np.arange(inicio, fin + 1).astype('datetime64[s]').astype(np.int64)
+
+    def period_table(self, periodo, capital_inicial=10000, factor_ajuste=0.10):
+        """Profit, nº de operaciones y rendimiento de cada período, con un único searchsorted vectorizado"""
+        inicios = self.period_boundaries(periodo)
+        bordes = np.searchsorted(self.times, inicios, side='left')
+        bordes = np.r_[bordes, len(self.times)]
+        profit = self.cum_profit[bordes[1:]] - self.cum_profit[bordes[:-1]]
+        return {
+            "starts": inicios,
+            "profit": profit,
+            "trades": np.diff(bordes),
+            "performance": profit * factor_ajuste / capital_inicial * 100,
+        }
+
+# ---------------------------
+# SERIES MÓVILES
+# ---------------------------
+
+def rolling_sum(valores, ventana):
+    """Suma móvil de 'ventana' elementos con sumas acumuladas (NaN hasta completar la primera ventana)"""
+    resultado = np.full(len(valores), np.nan)
+    if len(valores) >= ventana:
+        acumulado = np.r_[0.0, np.cumsum(valores)]
+        resultado[ventana - 1:] = acumulado[ventana:] - acumulado[:-ventana]
+    return resultado
+
+def rolling_metrics(tiempos, profits, capital_inicial, factor_ajuste, ventanas=ROLLING_WINDOWS, hoy=None):
+    """Sharpe, win rate y profit factor móviles por día natural y drawdown bajo el agua"""
+    return rolling_from_buckets(daily_buckets(tiempos, profits), capital_inicial, factor_ajuste, ventanas, hoy)
+
+def rolling_from_buckets(cubetas, capital_inicial, factor_ajuste, ventanas=ROLLING_WINDOWS, hoy=None):
+    """Métricas móviles a partir de las cubetas diarias (daily_buckets o MetricState.buckets)"""
+    primero = cubetas["first_day"]
+    if primero is None:
+        return {"days": np.empty(0, dtype=np.int64), "windows": {}, "underwater": np.empty(0)}
+
+    # Calendario denso desde el primer día con operaciones hasta hoy (días sin operaciones a cero)
+    largo = max(len(cubetas["count"]), (hoy if hoy is not None else 0) - primero + 1)
+
+    def por_dia(clave):
+        serie = np.zeros(largo)
+        serie[:len(cubetas[clave])] = cubetas[clave]
+        return serie
+
+    operaciones = por_dia("count")
+    ganadoras = por_dia("wins")
+    bruto_ganador = por_dia("gross_win")
+    bruto_perdedor = por_dia("gross_loss")
+    suma = por_dia("profit")
+    suma_cuadrados = por_dia("sq")
+
+    series = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for ventana in ventanas:
+            n = rolling_sum(operaciones, ventana)
+            ganancia = rolling_sum(bruto_ganador, ventana)
+            perdida = rolling_sum(bruto_perdedor, ventana)
+            s = rolling_sum(suma, ventana)
+            # Varianza muestral por operación a partir de sumas y sumas de cuadrados
+            varianza = np.maximum((rolling_sum(suma_cuadrados, ventana) - s * s / n) / (n - 1), 0.0)
+            desviacion = np.sqrt(varianza)
+
+            # El factor de ajuste se cancela en el Sharpe y en el profit factor
+            sharpe = np.where((n > 1) & (desviacion > 0), (s / n) / desviacion * np.sqrt(252), np.nan)
+            profit_factor = np.where(perdida > 0, ganancia / perdida, np.where(ganancia > 0, np.inf, np.nan))
+            series[ventana] = {
+                "sharpe": np.minimum(sharpe, SHARPE_CAP),
+                "win_rate": np.where(n > 0, rolling_sum(ganadoras, ventana) / n * 100, np.nan),
+                "profit_factor": np.minimum(profit_factor, PROFIT_FACTOR_CAP),
+            }
+
+    # Drawdown bajo el agua: capital al cierre de cada día frente a su máximo anterior
+    capital = capital_inicial + np.cumsum(suma) * factor_ajuste
+    bajo_el_agua = (capital / np.maximum.accumulate(capital) - 1) * 100
+
+    return {"days": primero + np.arange(largo), "windows": series, "underwater": bajo_el_agua}
+
+# ---------------------------
+# DESGLOSE POR SÍMBOLO Y DIRECCIÓN
+# ---------------------------
+
+# Sumas por grupo de las que salen las estadísticas (campo -> dtype)
+GROUP_SUMS = {"trades": np.int64, "wins": np.int64, "losses": np.int64, "win_sum": np.float64, "loss_sum": np.float64}
+
+def group_sums(codigos, n_grupos, profits):
+    """Sumas por grupo en una sola pasada con bincount sobre códigos enteros (sin bucles por grupo)"""
+    codigos = np.asarray(codigos, dtype=np.int64)
+    profits = np.asarray(profits, dtype=np.float64)
+    es_ganadora = profits > 0
+    es_perdedora = profits < 0
+
+    def suma(pesos=None):
+        return np.bincount(codigos, weights=pesos, minlength=n_grupos)
+
+    return {
+        "trades": suma().astype(np.int64),
+        "wins": suma(es_ganadora.astype(np.float64)).astype(np.int64),
+        "losses": suma(es_perdedora.astype(np.float64)).astype(np.int64),
+        "win_sum": suma(np.where(es_ganadora, profits, 0.0)),
+        "loss_sum": suma(np.where(es_perdedora, profits, 0.0)),
+    }
+
+def grouped_stats(codigos, n_grupos, profits):
+    """Estadísticas por grupo a partir de los códigos enteros de cada operación"""
+    return stats_from_sums(group_sums(codigos, n_grupos, profits))
+
+def stats_from_sums(sumas):
+    """Estadísticas por grupo a partir de group_sums (o de las sumas de un MetricState)"""
+    operaciones = sumas["trades"]
+    ganadoras = sumas["wins"]
+    perdedoras = sumas["losses"]
+    bruto_ganador = sumas["win_sum"]
+    bruto_perdedor = sumas["loss_sum"]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            "trades": operaciones,
+            "wins": ganadoras,
+            "losses": perdedoras,
+            "pnl": bruto_ganador + bruto_perdedor,
+            "win_rate": np.where(operaciones > 0, ganadoras / operaciones * 100, 0.0),
+            "profit_factor": np.where(perdedoras > 0, bruto_ganador / np.abs(bruto_perdedor), np.inf),
+            "expectancy": np.where(operaciones > 0, (bruto_ganador + bruto_perdedor) / operaciones, 0.0),
+            "avg_win": np.where(ganadoras > 0, bruto_ganador / ganadoras, 0.0),
+            "avg_loss": np.where(perdedoras > 0, bruto_perdedor / perdedoras, 0.0),
+        }
+
+def _signed_percent(valor, decimales):
+    return f"+{valor:.{decimales}f}%" if valor > 0 else f"{valor:.{decimales}f}%"
+
+def format_breakdown(nombres, stats, capital_inicial, factor_ajuste):
+    """Filas para la web (mismo formato que las cifras principales), ordenadas por nº de operaciones"""
+    a_porcentaje = factor_ajuste / capital_inicial * 100
+    orden = np.argsort(-stats["trades"], kind='stable')
+    filas = []
+    for i in orden[stats["trades"][orden] > 0]:
+        pf = stats["profit_factor"][i]
+        filas.append({
+            "name": str(nombres[i]),
+            "trades": int(stats["trades"][i]),
+            "winRate": f"{stats['win_rate'][i]:.1f}%",
+            "profitFactor": f"{pf:.1f}" if np.isfinite(pf) else "∞",
+            "expectancy": _signed_percent(stats["expectancy"][i] * a_porcentaje, 2),
+            "avgWin": _signed_percent(stats["avg_win"][i] * a_porcentaje, 2),
+            "avgLoss": _signed_percent(stats["avg_loss"][i] * a_porcentaje, 2),
+            "pnl": _signed_percent(stats["pnl"][i] * a_porcentaje, 1),
+        })
+    return filas
+
+def compute_breakdown(codigos_simbolo, simbolos, direcciones, profits, capital_inicial, factor_ajuste):
+    """Desglose por símbolo (códigos categóricos) y por dirección (0 = BUY, 1 = SELL)"""
+    return breakdown_from_sums(simbolos, group_sums(codigos_simbolo, len(simbolos), profits),
+                               group_sums(direcciones, 2, profits), capital_inicial, factor_ajuste)
+
+def breakdown_from_sums(simbolos, por_simbolo, por_direccion, capital_inicial, factor_ajuste):
+    """Desglose a partir de las sumas por símbolo y por dirección (los símbolos sin cierres quedan a cero)"""
+    por_simbolo = {campo: np.pad(v, (0, len(simbolos) - len(v))) for campo, v in por_simbolo.items()}
+    return {
+        "bySymbol": format_breakdown(simbolos, stats_from_sums(por_simbolo), capital_inicial, factor_ajuste),
+        "byDirection": format_breakdown(["BUY", "SELL"], stats_from_sums(por_direccion), capital_inicial, factor_ajuste),
+    }
@@ -0,0 +1,166 @@
+# ---------------------------
+# GENERACIÓN MULTICUENTA EN PARALELO - MM LADRÓN DEL DOJI
+# ---------------------------
+# Cada cuenta se procesa en su propio proceso (el paquete MetaTrader5 solo
+# admite una conexión por proceso), con su propio almacén y su propia salida.
+# Al terminar se escribe un resumen agregado de la cartera.
+#
+#   python update_trading_data.py --accounts accounts.json
+#
+# Formato de accounts.json (ver accounts.example.json):
+#   {"output_dir": "...", "workers": 4, "accounts": [
+#       {"name": "fondeada_1", "login": 123, "password": "...", "server": "...", "path": "C:/.../terminal64.exe"},
+#       {"name": "demo", "source": "synthetic", "deals": 50000}
+#   ]}
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import contextlib
+import io
+import json
+import os
+import time
+import deal_sources
+import deal_store
+import instrumentation
+import publisher
+import update_trading_data
+
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.expanduser("~"), "Desktop", "web_data_cuentas")
+MT5_INIT_KEYS = ("path", "login", "password", "server", "timeout", "portable")
+
+def load_accounts(path):
+    """Lee la configuración de cuentas"""
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    nombres = [cuenta["name"] for cuenta in config.get("accounts", [])]
+    if len(nombres) != len(set(nombres)):
+        raise ValueError("Los nombres de cuenta deben ser únicos")
+    return config
+
+def build_source(cuenta):
+    """Crea la fuente de operaciones de una cuenta con su propio almacén"""
+    store_dir = os.path.join(deal_store.DATA_DIR, "cuentas", cuenta["name"])
+    if cuenta.get("source", "mt5") == "synthetic":
+        return deal_sources.SyntheticSource(
+            num_deals=cuenta.get("deals", 10_000),
+            num_symbols=cuenta.get("symbols", 20),
+            seed=cuenta.get("seed", 42),
+            store_dir=store_dir
+        )
+    return deal_sources.MT5Source(store_dir=store_dir, **{k: cuenta[k] for k in MT5_INIT_KEYS if k in cuenta})
+
+def run_account(cuenta, output_dir, ajustes=None):
+    """Proceso trabajador: una sesión, un cálculo y una salida por cuenta.
+    'ajustes' son las opciones de la CLI (update_trading_data.apply_settings), que el proceso no hereda"""
+    inicio = time.perf_counter()
+    fuente = build_source(cuenta)
+    json_path = os.path.join(output_dir, cuenta["name"], "web_data.json")
+    os.makedirs(os.path.dirname(json_path), exist_ok=True)
+    timer = instrumentation.StageTimer(run_log_path=os.path.join(fuente.store_dir, "run_log.ndjson"))
+
+    update_trading_data.apply_settings(ajustes or {})
+    # Las cuentas ya se reparten entre procesos: la simulación de riesgo no abre más
+    update_trading_data.RISK_WORKERS = 1
+    # Cada cuenta publica su propia carpeta static/; la página del proyecto no se toca
+    update_trading_data.STATIC_PAGE_PATH = None
+
+    # La salida de cada trabajador se captura para no mezclar los logs de varias cuentas
+    salida = io.StringIO()
+    web_data = None
+    with contextlib.redirect_stdout(salida):
+        if fuente.initialize():
+            try:
+                web_data = update_trading_data.generate_web_data(fuente, fallback=False, json_path=json_path, timer=timer)
+            finally:
+                fuente.shutdown()
+        else:
+            print("❌ Error al conectar con MT5:", fuente.last_error())
+
+    return {
+        "name": cuenta["name"],
+        "ok": web_data is not None,
+        "duration": round(time.perf_counter() - inicio, 3),
+        "json_path": json_path,
+        "web_data": web_data,
+        "log": salida.getvalue()
+    }
+
+def _percent(valor):
+    return float(str(valor).replace("%", "").replace("+", ""))
+
+def portfolio_summary(resultados):
+    """Resumen agregado de la cartera (todas las cuentas parten del mismo capital)"""
+    validas = [r["web_data"] for r in resultados if r["ok"]]
+    total = sum(int(d["totalTrades"]) for d in validas)
+    ganadoras = sum(int(d["winningTrades"]) for d in validas)
+    perdedoras = sum(int(d["losingTrades"]) for d in validas)
+
+    def media(clave):
+        return sum(_percent(d[clave]) for d in validas) / len(validas) if validas else 0.0
+
+    def con_signo(valor, decimales=1):
+        return f"+{valor:.{decimales}f}%" if valor > 0 else f"{valor:.{decimales}f}%"
+
+    return {
+        "lastUpdate": datetime.now().strftime("%d/%m/%Y %H:%M"),
+        "accounts": len(resultados),
+        "accountsOk": len(validas),
+        "totalTrades": f"{total}",
+        "winningTrades": f"{ganadoras}",
+        "losingTrades": f"{perdedoras}",
+        "winRate": f"{(ganadoras / total * 100) if total else 0:.1f}%",
+        "totalProfit": con_signo(media("totalProfit")),
+        "monthlyProfit": con_signo(media("monthlyProfit")),
+        "weeklyPerformance": con_signo(media("weeklyPerformance")),
+        "worstDrawdown": f"{min((_percent(d['maxDrawdown']) for d in validas), default=0.0):.1f}%",
+        "perAccount": [
+            {
+                "name": r["name"],
+                "ok": r["ok"],
+                "totalProfit": r["web_data"]["totalProfit"] if r["ok"] else None,
+                "winRate": r["web_data"]["winRate"] if r["ok"] else None,
+                "maxDrawdown": r["web_data"]["maxDrawdown"] if r["ok"] else None,
+                "totalTrades": r["web_data"]["totalTrades"] if r["ok"] else None,
+                "dataFile": f"{r['name']}/web_data.json"
+            }
+            for r in resultados
+        ]
+    }
+
+def run_accounts(config_path, workers=None, ajustes=None):
+    """Procesa todas las cuentas en paralelo y escribe el resumen de cartera"""
+    config = load_accounts(config_path)
+    cuentas = config.get("accounts", [])
+    output_dir = config.get("output_dir", DEFAULT_OUTPUT_DIR)
+    workers = workers or config.get("workers") or len(cuentas)
+    if not cuentas:
+        print("❌ No hay cuentas configuradas")
+        return None
+
+    print(f"🏦 Procesando {len(cuentas)} cuentas con {workers} procesos...")
+    inicio = time.perf_counter()
+    resultados = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = {pool.submit(run_account, cuenta, output_dir, ajustes): cuenta["name"] for cuenta in cuentas}
+        for futuro in as_completed(futuros):
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                resultado = {"name": futuros[futuro], "ok": False, "duration": None, "web_data": None,
+                             "json_path": os.path.join(output_dir, futuros[futuro], "web_data.json"), "log": str(e)}
+            resultados.append(resultado)
+            icono = "✅" if resultado["ok"] else "❌"
+            print(f"{icono} {resultado['name']}: {resultado['duration']}s")
+            if not resultado["ok"]:
+                print(resultado["log"])
+
+    resultados.sort(key=lambda r: [c["name"] for c in cuentas].index(r["name"]))
+    resumen = portfolio_summary(resultados)
+    os.makedirs(output_dir, exist_ok=True)
+    publisher.publish_json(resumen, os.path.join(output_dir, "portfolio.json"))
+
+    print(f"📁 Resumen de cartera: {os.path.join(output_dir, 'portfolio.json')}")
+    print(f"⏱️ Tiempo total: {time.perf_counter() - inicio:.2f}s "
+          f"(suma de cuentas: {sum(r['duration'] or 0 for r in resultados):.2f}s)")
+    return resumen
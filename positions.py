@@ -0,0 +1,157 @@
+# ---------------------------
+# RECONSTRUCCIÓN DE POSICIONES - MM LADRÓN DEL DOJI
+# ---------------------------
+# Une las operaciones de entrada (entry == 0) y de salida (entry == 1) por
+# position_id con un join por ordenación: O(n log n) sobre todo el historial.
+#
+# Para las actualizaciones incrementales, track_positions mantiene el histograma
+# de permanencia lote a lote guardando solo las posiciones que siguen abiertas.
+import pandas as pd
+import numpy as np
+
+DEAL_ENTRY_IN = 0
+DEAL_ENTRY_OUT = 1
+
+HOLDING_TIME_BUCKETS = [
+    ("<1h", 3600),
+    ("1-4h", 4 * 3600),
+    ("4-24h", 24 * 3600),
+    ("1-7d", 7 * 24 * 3600),
+    (">7d", None),
+]
+
+# Posiciones abiertas que se arrastran entre lotes (campo -> dtype); -1 = sin dato
+OPEN_FIELDS = {"position_id": np.int64, "open_time": np.int64, "close_time": np.int64, "volume": np.float64, "bucket": np.int64}
+# Volumen pendiente por debajo del cual una posición se considera cerrada del todo
+CLOSED_VOLUME = 1e-8
+
+def _group_by_position(position_ids, tiempos):
+    """Ordena por (position_id, tiempo) y devuelve el orden y el inicio de cada grupo"""
+    orden = np.lexsort((tiempos, position_ids))
+    ids_ordenados = position_ids[orden]
+    inicios = np.flatnonzero(np.r_[True, ids_ordenados[1:] != ids_ordenados[:-1]]) if len(orden) else np.empty(0, dtype=np.int64)
+    return orden, inicios
+
+def reconstruct_positions(deals_df):
+    """Reconstruye las posiciones cerradas: apertura, cierre, duración, volumen y P&L por position_id"""
+    entrada = deals_df[deals_df['entry'] == DEAL_ENTRY_IN]
+    salida = deals_df[deals_df['entry'] == DEAL_ENTRY_OUT]
+
+    # Aperturas: primera operación de entrada de cada posición
+    pid_in = entrada['position_id'].to_numpy()
+    orden, inicios = _group_by_position(pid_in, entrada['time'].to_numpy())
+    aperturas = pd.DataFrame({
+        "position_id": pid_in[orden][inicios],
+        "symbol": entrada['symbol'].to_numpy()[orden][inicios],
+        "type": entrada['type'].to_numpy()[orden][inicios],
+        "open_time": entrada['time'].to_numpy()[orden][inicios],
+        "open_price": entrada['price'].to_numpy()[orden][inicios],
+        "volume": np.add.reduceat(entrada['volume'].to_numpy()[orden], inicios) if len(inicios) else np.empty(0),
+    })
+
+    # Cierres: la última salida marca el cierre, el P&L suma los cierres parciales
+    pid_out = salida['position_id'].to_numpy()
+    orden, inicios = _group_by_position(pid_out, salida['time'].to_numpy())
+    finales = np.r_[inicios[1:], len(orden)] - 1 if len(inicios) else inicios
+    cierres = pd.DataFrame({
+        "position_id": pid_out[orden][inicios],
+        "close_time": salida['time'].to_numpy()[orden][finales],
+        "close_price": salida['price'].to_numpy()[orden][finales],
+        "profit": np.add.reduceat(salida['profit'].to_numpy()[orden], inicios) if len(inicios) else np.empty(0),
+    })
+
+    # Ambos lados ya están ordenados por position_id: merge sin reordenar
+    posiciones = aperturas.merge(cierres, on='position_id', how='inner', sort=False)
+    posiciones['duration'] = posiciones['close_time'] - posiciones['open_time']
+    return posiciones
+
+def format_durations(segundos):
+    """Formatea duraciones en segundos como '45m', '3h 20m' o '2d 5h'"""
+    segundos = np.maximum(np.asarray(segundos, dtype=np.int64), 0)
+    dias = (segundos // 86400).astype(str)
+    horas = (segundos % 86400 // 3600).astype(str)
+    minutos = (segundos % 3600 // 60).astype(str)
+    horas_totales = segundos // 3600
+
+    return np.where(
+        segundos < 3600, np.char.add(minutos, "m"),
+        np.where(
+            horas_totales < 24,
+            np.char.add(np.char.add(horas, "h "), np.char.add(minutos, "m")),
+            np.char.add(np.char.add(dias, "d "), np.char.add(horas, "h"))
+        )
+    )
+
+def positions_of(deals_df, position_ids):
+    """Operaciones de las posiciones indicadas (para reconstruir solo esas)"""
+    return deals_df[deals_df['position_id'].isin(np.asarray(position_ids))]
+
+def holding_buckets(duraciones):
+    """Cubeta de HOLDING_TIME_BUCKETS de cada duración (segundos)"""
+    limites = [limite for _, limite in HOLDING_TIME_BUCKETS if limite is not None]
+    return np.searchsorted(limites, duraciones, side='right')
+
+def holding_time_data(conteos):
+    """Histograma de permanencia para la web a partir de los conteos por cubeta"""
+    return {
+        "labels": [etiqueta for etiqueta, _ in HOLDING_TIME_BUCKETS],
+        "data": [int(c) for c in conteos]
+    }
+
+def holding_time_distribution(posiciones):
+    """Histograma de tiempos de permanencia para la web"""
+    cubetas = holding_buckets(posiciones['duration'].to_numpy())
+    return holding_time_data(np.bincount(cubetas, minlength=len(HOLDING_TIME_BUCKETS)))
+
+def empty_open_positions():
+    return {campo: np.empty(0, dtype=dtype) for campo, dtype in OPEN_FIELDS.items()}
+
+def track_positions(abiertas, conteos, columnas):
+    """Aplica un lote de operaciones (en orden de tiempo) a las posiciones abiertas y al histograma.
+    Igual que reconstruct_positions, cada posición con entrada y salida cuenta una vez con la duración
+    desde su primera entrada hasta su última salida; cuando se cierra todo su volumen la cubeta queda
+    fija y la posición deja de guardarse. Devuelve (abiertas, conteos)"""
+    es_entrada = columnas["entry"] == DEAL_ENTRY_IN
+    es_salida = columnas["entry"] == DEAL_ENTRY_OUT
+    lote = es_entrada | es_salida
+    if not lote.any():
+        return abiertas, conteos
+    ids = np.asarray(columnas["position_id"][lote], dtype=np.int64)
+    tiempos = np.asarray(columnas["time"][lote], dtype=np.int64)
+    volumen = np.asarray(columnas["volume"][lote], dtype=np.float64)
+    es_entrada = es_entrada[lote]
+    es_salida = es_salida[lote]
+
+    # Posiciones arrastradas y del lote sobre un mismo índice ordenado
+    todas, indices = np.unique(np.r_[abiertas["position_id"], ids], return_inverse=True)
+    n = len(todas)
+    previas = indices[:len(abiertas["position_id"])]
+    grupo = indices[len(abiertas["position_id"]):]
+    campos = {}
+    for campo, dtype in OPEN_FIELDS.items():
+        campos[campo] = np.zeros(n, dtype=dtype) if campo == "volume" else np.full(n, -1, dtype=dtype)
+        campos[campo][previas] = abiertas[campo]
+    campos["position_id"] = todas
+    apertura, cierre, cubeta = campos["open_time"], campos["close_time"], campos["bucket"]
+
+    # Primera entrada (las anteriores al lote ya estaban guardadas) y última salida
+    primeras, indices = np.unique(grupo[es_entrada], return_index=True)
+    sin_apertura = apertura[primeras] < 0
+    apertura[primeras[sin_apertura]] = tiempos[es_entrada][indices[sin_apertura]]
+    ultimas, indices = np.unique(grupo[es_salida][::-1], return_index=True)
+    cierre[ultimas] = np.maximum(cierre[ultimas], tiempos[es_salida][::-1][indices])
+    campos["volume"] += (np.bincount(grupo[es_entrada], weights=volumen[es_entrada], minlength=n)
+                         - np.bincount(grupo[es_salida], weights=volumen[es_salida], minlength=n))
+
+    # Solo se recuentan las posiciones del lote: sale su cubeta anterior y entra la nueva
+    tocadas = np.zeros(n, dtype=bool)
+    tocadas[grupo] = True
+    conteos = np.array(conteos, dtype=np.int64)
+    anteriores = cubeta[tocadas]
+    conteos -= np.bincount(anteriores[anteriores >= 0], minlength=len(conteos))
+    emparejadas = tocadas & (apertura >= 0) & (cierre >= 0)
+    cubeta[emparejadas] = holding_buckets(cierre[emparejadas] - apertura[emparejadas])
+    conteos += np.bincount(cubeta[emparejadas], minlength=len(conteos))
+
+    cerradas = (apertura >= 0) & (cierre >= 0) & (campos["volume"] <= CLOSED_VOLUME)
+    return {campo: valores[~cerradas] for campo, valores in campos.items()}, conteos
@@ -0,0 +1,142 @@
+# ---------------------------
+# PUBLICACIÓN DE DATOS WEB - MM LADRÓN DEL DOJI
+# ---------------------------
+# Escritura atómica (fichero temporal + os.replace) para que web_data.json
+# nunca desaparezca ni quede a medias, y comparación por hash del contenido
+# para no reescribir (ni forzar commit/deploy) cuando nada ha cambiado.
+#
+# Además puede dividir los datos en un manifiesto pequeño (web_manifest.json,
+# que la página revalida en cada visita) y fragmentos inmutables con el hash
+# del contenido en el nombre (data/<clave>.<hash>.json), cacheables para siempre.
+#
+# No se generan variantes precomprimidas: Netlify comprime (gzip/brotli) las
+# respuestas de texto por su cuenta según lo que acepte cada navegador.
+import hashlib
+import json
+import os
+import tempfile
+
+# Claves que cambian en cada ejecución aunque los datos sean los mismos
+VOLATILE_KEYS = {"lastUpdate"}
+
+# Secciones grandes que se publican como fragmentos inmutables
+CHUNKED_KEYS = ["latestTrades", "equityData", "equityCurves", "dailyProfitData", "recentTradesData", "holdingTimeData", "breakdown", "rollingData", "periodReturns"]
+MANIFEST_NAME = "web_manifest.json"
+CHUNK_DIR = "data"
+# Versiones anteriores de cada fragmento que se conservan para visitantes con un manifiesto antiguo
+CHUNK_VERSIONS_KEPT = 3
+
+def serialize(web_data, compact=False):
+    """Serializa los datos en JSON indentado o compacto"""
+    if compact:
+        return json.dumps(web_data, ensure_ascii=False, separators=(',', ':'))
+    return json.dumps(web_data, ensure_ascii=False, indent=2)
+
+def content_hash(web_data):
+    """Hash estable del contenido, ignorando las claves volátiles"""
+    contenido = {k: v for k, v in web_data.items() if k not in VOLATILE_KEYS}
+    canonico = json.dumps(contenido, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonico.encode('utf-8')).hexdigest()
+
+def read_existing_hash(path):
+    """Hash del fichero ya publicado (None si no existe o no es JSON válido)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return content_hash(json.load(f))
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def atomic_write(path, contenido):
+    """Escribe en un temporal del mismo directorio y lo renombra sobre el destino"""
+    carpeta = os.path.dirname(os.path.abspath(path))
+    os.makedirs(carpeta, exist_ok=True)
+    modo = 'wb' if isinstance(contenido, bytes) else 'w'
+    fd, tmp_path = tempfile.mkstemp(dir=carpeta, prefix=".tmp_", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, modo, **({} if modo == 'wb' else {"encoding": "utf-8"})) as f:
+            f.write(contenido)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp crea el fichero con permisos 0600; se usan los normales del usuario
+        mascara = os.umask(0)
+        os.umask(mascara)
+        os.chmod(tmp_path, 0o666 & ~mascara)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def publish_json(web_data, path, compact=False, force=False):
+    """Publica web_data en 'path' si su contenido ha cambiado. Devuelve True si se escribió"""
+    if not force and read_existing_hash(path) == content_hash(web_data):
+        return False
+
+    atomic_write(path, serialize(web_data, compact))
+    return True
+
+def publish_split(web_data, out_dir, compact=False):
+    """Publica el manifiesto y los fragmentos con hash en 'out_dir'. Devuelve (manifiesto, escrito)"""
+    carpeta_fragmentos = os.path.join(out_dir, CHUNK_DIR)
+    os.makedirs(carpeta_fragmentos, exist_ok=True)
+
+    manifiesto = {k: v for k, v in web_data.items() if k not in CHUNKED_KEYS}
+    manifiesto["chunks"] = {}
+    for clave in CHUNKED_KEYS:
+        if clave not in web_data:
+            continue
+        contenido = serialize(web_data[clave], compact=True).encode('utf-8')
+        nombre = f"{clave}.{hashlib.sha256(contenido).hexdigest()[:16]}.json"
+        ruta = os.path.join(carpeta_fragmentos, nombre)
+        # Mismo nombre => mismo contenido: nunca se reescribe un fragmento existente
+        if not os.path.exists(ruta):
+            atomic_write(ruta, contenido)
+        manifiesto["chunks"][clave] = f"{CHUNK_DIR}/{nombre}"
+
+    escrito = publish_json(manifiesto, os.path.join(out_dir, MANIFEST_NAME), compact=compact)
+    prune_chunks(carpeta_fragmentos, set(os.path.basename(r) for r in manifiesto["chunks"].values()))
+    return manifiesto, escrito
+
+def prune_chunks(carpeta, en_uso, conservar=CHUNK_VERSIONS_KEPT):
+    """Borra los fragmentos antiguos, conservando los en uso y las últimas versiones de cada clave"""
+    por_clave = {}
+    for nombre in os.listdir(carpeta):
+        partes = nombre.split(".")
+        if len(partes) == 3 and partes[2] == "json":
+            por_clave.setdefault(partes[0], []).append(nombre)
+
+    for nombres in por_clave.values():
+        nombres.sort(key=lambda n: os.path.getmtime(os.path.join(carpeta, n)), reverse=True)
+        for nombre in nombres[conservar:]:
+            if nombre not in en_uso:
+                # El fragmento y las variantes .gz/.br que dejaban versiones anteriores
+                for ruta in [nombre, nombre + ".gz", nombre + ".br"]:
+                    if os.path.exists(os.path.join(carpeta, ruta)):
+                        os.remove(os.path.join(carpeta, ruta))
+
+def verify_split(out_dir):
+    """Comprueba el manifiesto y sus fragmentos (existencia y hash del nombre). Devuelve (datos, problemas)"""
+    problemas = []
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifiesto = json.load(f)
+    except (OSError, ValueError) as e:
+        return None, [f"{MANIFEST_NAME}: {e}"]
+
+    datos = {k: v for k, v in manifiesto.items() if k != "chunks"}
+    for clave, ruta_relativa in manifiesto.get("chunks", {}).items():
+        ruta = os.path.join(out_dir, ruta_relativa)
+        try:
+            with open(ruta, 'rb') as f:
+                contenido = f.read()
+        except OSError:
+            problemas.append(f"{ruta_relativa}: no existe")
+            continue
+
+        if hashlib.sha256(contenido).hexdigest()[:16] != os.path.basename(ruta).split(".")[1]:
+            problemas.append(f"{ruta_relativa}: el contenido no coincide con el hash del nombre")
+        try:
+            datos[clave] = json.loads(contenido)
+        except ValueError as e:
+            problemas.append(f"{ruta_relativa}: {e}")
+    return datos, problemas
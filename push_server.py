@@ -0,0 +1,187 @@
+# ---------------------------
+# SERVIDOR DE ACTUALIZACIONES EN VIVO - MM LADRÓN DEL DOJI
+# ---------------------------
+# Servidor HTTP mínimo con asyncio (sin dependencias) que acompaña al modo
+# daemon: sirve el último snapshot y, al terminar cada actualización, envía por
+# Server-Sent Events solo los campos que han cambiado y las operaciones nuevas.
+#
+#   python update_trading_data.py --daemon --interval 5 --serve 8765
+#
+#   GET /snapshot  -> web_data completo (JSON)
+#   GET /events    -> text/event-stream: "snapshot" al conectar y luego "delta"
+#
+# El bucle del daemon es síncrono (MT5 bloquea), así que el servidor corre en
+# su propio hilo con su propio bucle de eventos; publish() es seguro desde
+# cualquier hilo.
+import asyncio
+import json
+import threading
+
+DEFAULT_PORT = 8765
+HEARTBEAT_SECONDS = 15
+# Mensajes pendientes por cliente antes de desconectarlo por lento
+CLIENT_QUEUE_SIZE = 100
+
+def new_trades(anteriores, actuales):
+    """Operaciones al principio de 'actuales' (más recientes primero) que no estaban en 'anteriores'.
+    None si no se puede enlazar con la lista anterior (hay que enviarla completa)"""
+    if not anteriores:
+        return None
+    for i, operacion in enumerate(actuales):
+        if operacion == anteriores[0]:
+            return actuales[:i]
+    return None
+
+def compute_delta(anterior, actual):
+    """Campos de primer nivel que han cambiado, claves eliminadas y operaciones nuevas"""
+    cambios = {k: v for k, v in actual.items() if k != "latestTrades" and anterior.get(k) != v}
+    eliminadas = [k for k in anterior if k not in actual]
+    delta = {"changed": cambios, "removed": eliminadas}
+
+    nuevas = new_trades(anterior.get("latestTrades"), actual.get("latestTrades", []))
+    if nuevas is None:
+        if anterior.get("latestTrades") != actual.get("latestTrades"):
+            cambios["latestTrades"] = actual.get("latestTrades", [])
+    elif nuevas:
+        delta["newTrades"] = nuevas
+    return delta
+
+def is_empty_delta(delta):
+    return not delta["changed"] and not delta["removed"] and not delta.get("newTrades")
+
+def sse_message(evento, datos):
+    """Mensaje SSE con un único campo data (JSON compacto en una línea)"""
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False, separators=(',', ':'))}\n\n".encode('utf-8')
+
+class PushServer:
+    """Snapshot actual + clientes SSE suscritos"""
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self.snapshot = None
+        self.version = 0
+        self._clientes = set()
+        self._loop = None
+        self._server = None
+        self._listo = threading.Event()
+
+    # -- Hilo del servidor --------------------------------------------------
+
+    def start(self):
+        """Arranca el servidor en un hilo en segundo plano y espera a que escuche"""
+        hilo = threading.Thread(target=self._run, name="push-server", daemon=True)
+        hilo.start()
+        self._listo.wait()
+        return self
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        # Con port=0 el sistema elige un puerto libre
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._listo.set()
+        self._loop.run_forever()
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    # -- Publicación ----------------------------------------------------------
+
+    def publish(self, web_data):
+        """Publica un nuevo snapshot (desde cualquier hilo); los clientes reciben solo el delta"""
+        if self._loop is None:
+            self._apply(web_data)
+        else:
+            self._loop.call_soon_threadsafe(self._apply, web_data)
+
+    def _apply(self, web_data):
+        anterior = self.snapshot
+        self.snapshot = web_data
+        if anterior is None:
+            self.version += 1
+            self._broadcast(sse_message("snapshot", {"version": self.version, "data": web_data}))
+            return
+
+        delta = compute_delta(anterior, web_data)
+        if is_empty_delta(delta):
+            return
+        self.version += 1
+        delta["version"] = self.version
+        self._broadcast(sse_message("delta", delta))
+
+    def _broadcast(self, mensaje):
+        for cola in list(self._clientes):
+            try:
+                cola.put_nowait(mensaje)
+            except asyncio.QueueFull:
+                # Cliente demasiado lento: se vacía su cola y se le desconecta (al reconectar recibe el snapshot)
+                while not cola.empty():
+                    cola.get_nowait()
+                cola.put_nowait(None)
+                self._clientes.discard(cola)
+
+    # -- HTTP -----------------------------------------------------------------
+
+    async def _handle(self, reader, writer):
+        try:
+            peticion = await reader.readline()
+            # Cabeceras de la petición (se ignoran)
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            partes = peticion.decode('latin-1').split()
+            metodo, ruta = (partes[0], partes[1].split("?")[0]) if len(partes) >= 2 else ("", "")
+
+            if metodo == "OPTIONS":
+                await self._respond(writer, "204 No Content", b"", "text/plain")
+            elif metodo != "GET":
+                await self._respond(writer, "405 Method Not Allowed", b"", "text/plain")
+            elif ruta == "/snapshot":
+                if self.snapshot is None:
+                    await self._respond(writer, "503 Service Unavailable", b"{}", "application/json")
+                else:
+                    cuerpo = json.dumps(self.snapshot, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                    await self._respond(writer, "200 OK", cuerpo, "application/json; charset=utf-8")
+            elif ruta == "/events":
+                await self._stream(writer)
+            else:
+                await self._respond(writer, "404 Not Found", b"", "text/plain")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _headers(estado, tipo, extra=""):
+        # CORS abierto: la página se sirve desde otro origen (Netlify o un fichero local)
+        return (f"HTTP/1.1 {estado}\r\nContent-Type: {tipo}\r\nCache-Control: no-cache\r\n"
+                f"Access-Control-Allow-Origin: *\r\n{extra}\r\n").encode('latin-1')
+
+    async def _respond(self, writer, estado, cuerpo, tipo):
+        writer.write(self._headers(estado, tipo, f"Content-Length: {len(cuerpo)}\r\nConnection: close\r\n") + cuerpo)
+        await writer.drain()
+
+    async def _stream(self, writer):
+        cola = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        # Suscripción y snapshot sin ningún await entre medias: cualquier _apply posterior
+        # encola su delta para este cliente, y ninguno puede colarse antes del snapshot
+        self._clientes.add(cola)
+        writer.write(self._headers("200 OK", "text/event-stream; charset=utf-8", "Connection: keep-alive\r\n"))
+        if self.snapshot is not None:
+            writer.write(sse_message("snapshot", {"version": self.version, "data": self.snapshot}))
+        try:
+            await writer.drain()
+            while True:
+                try:
+                    mensaje = await asyncio.wait_for(cola.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    mensaje = b": ping\n\n"  # comentario SSE para mantener viva la conexión
+                if mensaje is None:
+                    break
+                writer.write(mensaje)
+                await writer.drain()
+        finally:
+            self._clientes.discard(cola)
@@ -0,0 +1,122 @@
+# ---------------------------
+# SIMULACIÓN DE RIESGO (MONTE CARLO) - MM LADRÓN DEL DOJI
+# ---------------------------
+# Remuestrea con reemplazo (bootstrap) el profit real de cada operación para
+# construir miles de curvas de capital posibles y resume la distribución de
+# drawdown máximo, rentabilidad final y probabilidad de ruina por percentiles.
+#
+# Las curvas se simulan por bloques (matrices caminos x operaciones de tamaño
+# acotado) y los bloques se reparten entre procesos. Cada bloque tiene su propia
+# semilla derivada de la principal: el resultado no depende del nº de procesos.
+#
+# El resultado se guarda en el almacén junto con un hash de los profits y los
+# parámetros: mientras no haya operaciones nuevas no se vuelve a simular.
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import os
+import numpy as np
+import publisher
+
+DEFAULT_PATHS = 10_000
+# Operaciones por camino: las del historial, con este máximo
+MAX_HORIZON = 10_000
+# Celdas (caminos x operaciones) por bloque: acota la memoria de cada proceso (~8 bytes por celda y matriz)
+CHUNK_CELLS = 2_000_000
+# Por debajo de estas celdas no compensa arrancar procesos
+PARALLEL_MIN_CELLS = 5_000_000
+PERCENTILES = (5, 25, 50, 75, 95)
+# Ruina: el capital cae por debajo de este porcentaje de pérdida sobre el inicial
+RUIN_LOSS = 20.0
+DEFAULT_SEED = 42
+CACHE_NAME = "risk_cache.json"
+
+def simulate_chunk(profits, n_caminos, horizonte, capital_inicial, factor_ajuste, semilla):
+    """Simula un bloque de caminos. Devuelve (drawdown máximo %, rentabilidad final %, ruina) por camino"""
+    rng = np.random.default_rng(semilla)
+    indices = rng.integers(0, len(profits), size=(n_caminos, horizonte), dtype=np.int32)
+
+    # Capital a lo largo de cada camino, reutilizando el mismo buffer
+    capital = np.take(profits * factor_ajuste, indices)
+    del indices
+    np.cumsum(capital, axis=1, out=capital)
+    capital += capital_inicial
+
+    # El máximo parte del capital inicial: una primera pérdida ya es drawdown
+    picos = np.maximum.accumulate(capital, axis=1)
+    np.maximum(picos, capital_inicial, out=picos)
+    np.divide(capital, picos, out=picos)
+    drawdown = (picos.min(axis=1) - 1) * 100
+    del picos
+
+    rentabilidad = (capital[:, -1] / capital_inicial - 1) * 100
+    ruina = capital.min(axis=1) <= capital_inicial * (1 - RUIN_LOSS / 100)
+    return drawdown, rentabilidad, ruina
+
+def _simulate_chunk_args(argumentos):
+    return simulate_chunk(*argumentos)
+
+def chunk_sizes(n_caminos, horizonte, celdas=None):
+    """Reparte los caminos en bloques de como mucho 'celdas' celdas (CHUNK_CELLS por defecto)"""
+    celdas = celdas or CHUNK_CELLS
+    por_bloque = max(1, celdas // max(horizonte, 1))
+    return [min(por_bloque, n_caminos - i) for i in range(0, n_caminos, por_bloque)]
+
+def run_simulation(profits, capital_inicial, factor_ajuste, n_caminos=DEFAULT_PATHS, horizonte=None,
+                   workers=None, semilla=DEFAULT_SEED):
+    """Simula n_caminos curvas de capital por bootstrap y resume sus percentiles"""
+    profits = np.ascontiguousarray(profits, dtype=np.float64)
+    if len(profits) == 0:
+        return None
+    horizonte = horizonte or min(len(profits), MAX_HORIZON)
+
+    tamaños = chunk_sizes(n_caminos, horizonte)
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamaños))
+    tareas = [(profits, n, horizonte, capital_inicial, factor_ajuste, s) for n, s in zip(tamaños, semillas)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(tareas) > 1 and n_caminos * horizonte >= PARALLEL_MIN_CELLS:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tareas))) as pool:
+            resultados = list(pool.map(_simulate_chunk_args, tareas))
+    else:
+        resultados = [simulate_chunk(*tarea) for tarea in tareas]
+
+    drawdown = np.concatenate([r[0] for r in resultados])
+    rentabilidad = np.concatenate([r[1] for r in resultados])
+    ruina = np.concatenate([r[2] for r in resultados])
+
+    # Drawdown: el percentil 5 es el peor escenario razonable (valores negativos)
+    return {
+        "paths": n_caminos,
+        "horizon": horizonte,
+        "drawdown": {f"p{p}": v for p, v in zip(PERCENTILES, np.percentile(drawdown, PERCENTILES).tolist())},
+        "return": {f"p{p}": v for p, v in zip(PERCENTILES, np.percentile(rentabilidad, PERCENTILES).tolist())},
+        "ruin_probability": float(ruina.mean() * 100),
+        "ruin_loss": RUIN_LOSS,
+    }
+
+def cached_simulation(data_dir, profits, capital_inicial, factor_ajuste, n_caminos=DEFAULT_PATHS, workers=None,
+                      semilla=DEFAULT_SEED):
+    """run_simulation reutilizando el último resultado si los profits y los parámetros no han cambiado"""
+    profits = np.ascontiguousarray(profits, dtype=np.float64)
+    huella = hashlib.sha256(profits.tobytes())
+    # CHUNK_CELLS decide el reparto en bloques y, con él, la semilla de cada bloque
+    parametros = [capital_inicial, factor_ajuste, n_caminos, semilla, MAX_HORIZON, RUIN_LOSS, CHUNK_CELLS]
+    huella.update(json.dumps(parametros).encode('utf-8'))
+    clave = huella.hexdigest()
+
+    ruta = os.path.join(data_dir, CACHE_NAME)
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get("key") == clave:
+            return cache["result"]
+    except (OSError, ValueError):
+        pass
+
+    resultado = run_simulation(profits, capital_inicial, factor_ajuste, n_caminos, workers=workers, semilla=semilla)
+    try:
+        publisher.atomic_write(ruta, json.dumps({"key": clave, "result": resultado}))
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar la simulación de riesgo: {e}")
+    return resultado
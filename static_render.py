@@ -0,0 +1,181 @@
+# ---------------------------
+# RENDERIZADO ESTÁTICO (SVG + HTML) - MM LADRÓN DEL DOJI
+# ---------------------------
+# Junto a web_data.json se generan versiones ya dibujadas de lo que la página
+# muestra primero, para que tenga contenido antes de cargar Chart.js y el JSON:
+#   static/equity.svg        curva de capital
+#   static/daily_profit.svg  ganancias diarias (barras verdes/rojas)
+#   static/trades.svg        operaciones por día
+#   static/stats.html        tarjetas de estadísticas principales (con sparklines en línea)
+#
+# El fragmento se puede incrustar en index.html entre los marcadores
+# STATIC_START/STATIC_END; después el JavaScript actualiza los valores y
+# sustituye las imágenes por los gráficos interactivos.
+import html
+import os
+import publisher
+
+STATIC_DIR = "static"
+STATIC_START = "<!-- static-stats:start -->"
+STATIC_END = "<!-- static-stats:end -->"
+
+# Mismos colores que los gráficos de index.html
+EQUITY_COLOR = "#38bdf8"
+TRADES_COLOR = "#94a3b8"
+POSITIVE_COLOR = "#10b981"
+NEGATIVE_COLOR = "#ef4444"
+
+# Tamaño (viewBox) de las imágenes de los gráficos y de las sparklines de las tarjetas
+CHART_SIZE = (600, 300)
+SPARKLINE_SIZE = (160, 36)
+# Resolución (LTTB) de la curva de capital para cada tamaño: la del gráfico de escritorio y la básica
+CHART_EQUITY_POINTS = 200
+SPARKLINE_EQUITY_POINTS = 50
+
+def _coord(valor):
+    # Un decimal basta para el tamaño de la imagen y reduce el SVG a la mitad
+    return f"{valor:.1f}".rstrip("0").rstrip(".")
+
+def _scale(valores, alto, margen):
+    """Posiciones verticales (0 arriba) para los valores, con la misma escala para todos"""
+    minimo, maximo = min(valores), max(valores)
+    rango = (maximo - minimo) or 1.0
+    return lambda v: margen + (maximo - v) / rango * (alto - 2 * margen)
+
+def _svg(ancho, alto, contenido, titulo):
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {ancho} {alto}" '
+            f'preserveAspectRatio="none" role="img" aria-label="{html.escape(titulo)}">'
+            f'<title>{html.escape(titulo)}</title>{contenido}</svg>')
+
+def line_svg(valores, titulo, color=EQUITY_COLOR, tamaño=CHART_SIZE, relleno=True):
+    """Línea (con área rellena) de la serie completa"""
+    ancho, alto = tamaño
+    if len(valores) < 2:
+        return _svg(ancho, alto, "", titulo)
+
+    y = _scale(valores, alto, margen=2)
+    paso = ancho / (len(valores) - 1)
+    puntos = " ".join(f"{_coord(i * paso)},{_coord(y(v))}" for i, v in enumerate(valores))
+    contenido = ""
+    if relleno:
+        contenido += f'<polygon points="0,{alto} {puntos} {ancho},{alto}" fill="{color}" fill-opacity="0.1"/>'
+    contenido += (f'<polyline points="{puntos}" fill="none" stroke="{color}" stroke-width="2" '
+                  f'stroke-linejoin="round" vector-effect="non-scaling-stroke"/>')
+    return _svg(ancho, alto, contenido, titulo)
+
+def bars_svg(valores, titulo, tamaño=CHART_SIZE):
+    """Barras desde el cero: verdes las positivas y rojas las negativas"""
+    ancho, alto = tamaño
+    if not valores:
+        return _svg(ancho, alto, "", titulo)
+
+    # El cero siempre dentro de la escala, como beginAtZero en Chart.js
+    y = _scale(list(valores) + [0], alto, margen=1)
+    base = y(0)
+    hueco = ancho / len(valores)
+    barra = hueco * 0.8
+    rectangulos = []
+    for i, v in enumerate(valores):
+        arriba = min(y(v), base)
+        color = POSITIVE_COLOR if v >= 0 else NEGATIVE_COLOR
+        rectangulos.append(f'<rect x="{_coord(i * hueco + (hueco - barra) / 2)}" y="{_coord(arriba)}" '
+                           f'width="{_coord(barra)}" height="{_coord(max(abs(y(v) - base), 0.5))}" fill="{color}"/>')
+    return _svg(ancho, alto, "".join(rectangulos), titulo)
+
+def without_weekends(serie):
+    """Quita los días a 0 salvo el último (igual que removeWeekendData en index.html)"""
+    datos = serie.get("data", [])
+    return [v for i, v in enumerate(datos) if v != 0 or i == len(datos) - 1]
+
+def equity_series(web_data, puntos):
+    """Curva de capital con la resolución pedida (equityData si no se publicó esa)"""
+    curvas = web_data.get("equityCurves") or {}
+    if str(puntos) in curvas:
+        return curvas[str(puntos)]["data"]
+    return web_data.get("equityData", {}).get("data", [])
+
+def render_charts(web_data):
+    """SVG de los tres gráficos: {nombre de fichero: contenido}"""
+    return {
+        "equity.svg": line_svg(equity_series(web_data, CHART_EQUITY_POINTS), "Evolución del capital"),
+        "daily_profit.svg": bars_svg(without_weekends(web_data.get("dailyProfitData", {})), "Ganancias diarias (€)"),
+        "trades.svg": line_svg(without_weekends(web_data.get("recentTradesData", {})), "Operaciones por día",
+                               color=TRADES_COLOR),
+    }
+
+def _value_class(valor, por_defecto="positive"):
+    texto = str(valor)
+    if texto.startswith("-"):
+        return "negative"
+    if texto.startswith("+"):
+        return "positive"
+    return por_defecto
+
+def stats_fragment(web_data):
+    """Tarjetas de estadísticas principales con los valores ya escritos (mismos ids que index.html)"""
+    equity = equity_series(web_data, SPARKLINE_EQUITY_POINTS)
+    diarias = without_weekends(web_data.get("dailyProfitData", {}))
+    operaciones = without_weekends(web_data.get("recentTradesData", {}))
+    tarjetas = [
+        ("Rentabilidad Total", "total-profit", web_data.get("totalProfit", "-"), "Desde el inicio",
+         line_svg(equity, "Evolución del capital", tamaño=SPARKLINE_SIZE, relleno=False)),
+        ("Rentabilidad Mensual", "monthly-profit", web_data.get("monthlyProfit", "-"), "Promedio 30 días",
+         bars_svg(diarias, "Ganancias diarias", tamaño=SPARKLINE_SIZE)),
+        ("Operaciones Ganadoras", "win-rate", web_data.get("winRate", "-"), "Porcentaje de acierto",
+         line_svg(operaciones, "Operaciones por día", color=TRADES_COLOR, tamaño=SPARKLINE_SIZE, relleno=False)),
+        ("Drawdown Máximo", "max-drawdown", web_data.get("maxDrawdown", "-"), "Máxima pérdida acumulada", ""),
+    ]
+
+    lineas = ['<div class="stats-container">']
+    for titulo, id_html, valor, pie, sparkline in tarjetas:
+        clase = "negative" if id_html == "max-drawdown" else _value_class(valor)
+        lineas.append('    <div class="stat-card">')
+        lineas.append(f'        <h3>{html.escape(titulo)}</h3>')
+        lineas.append(f'        <div class="stat-value {clase}" id="{id_html}">{html.escape(str(valor))}</div>')
+        if sparkline:
+            lineas.append(f'        <div class="sparkline">{sparkline}</div>')
+        lineas.append(f'        <p>{html.escape(pie)}</p>')
+        lineas.append('    </div>')
+    lineas.append('</div>')
+    return "\n".join(lineas) + "\n"
+
+def _write_if_changed(path, datos):
+    """Escribe 'datos' (bytes) solo si difieren de lo publicado. Devuelve True si escribió"""
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == datos:
+                return False
+    except OSError:
+        pass
+    publisher.atomic_write(path, datos)
+    return True
+
+def publish_static(web_data, out_dir):
+    """Escribe los SVG y el fragmento HTML en out_dir/static. Devuelve (fragmento, ficheros reescritos)"""
+    carpeta = os.path.join(out_dir, STATIC_DIR)
+    fragmento = stats_fragment(web_data)
+    ficheros = dict(render_charts(web_data), **{"stats.html": fragmento})
+    escritos = [nombre for nombre, contenido in ficheros.items()
+                if _write_if_changed(os.path.join(carpeta, nombre), contenido.encode('utf-8'))]
+    return fragmento, escritos
+
+def inline_fragment(page_path, fragmento):
+    """Sustituye el contenido entre los marcadores de la página por el fragmento.
+    Conserva los saltos de línea de la página (CRLF/LF). Devuelve True si la página cambió"""
+    with open(page_path, 'rb') as f:
+        pagina = f.read().decode('utf-8')
+    inicio = pagina.find(STATIC_START)
+    fin = pagina.find(STATIC_END)
+    if inicio < 0 or fin < inicio:
+        return False
+
+    # El fragmento se indenta como el marcador de inicio
+    salto = "\r\n" if "\r\n" in pagina else "\n"
+    linea = pagina.rfind("\n", 0, inicio) + 1
+    sangria = pagina[linea:inicio]
+    cuerpo = "".join(sangria + l + salto for l in fragmento.splitlines())
+    nueva = pagina[:inicio] + STATIC_START + salto + cuerpo + sangria + pagina[fin:]
+    if nueva == pagina:
+        return False
+    publisher.atomic_write(page_path, nueva.encode('utf-8'))
+    return True
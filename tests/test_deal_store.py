@@ -0,0 +1,108 @@
+# ---------------------------
+# PRUEBAS DEL ALMACÉN COLUMNAR - MM LADRÓN DEL DOJI
+# ---------------------------
+# Una escritura interrumpida (Ctrl+C en modo daemon, corte de luz...) no debe
+# dejar el almacén ilegible ni con columnas desfasadas.
+#
+#   python -m pytest -q tests
+from datetime import datetime
+import json
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deal_sources
+import deal_store
+
+INICIO = datetime(2024, 1, 1)
+FIN = datetime(2025, 6, 30, 18, 0)
+
+def synthetic_frame(num_deals=3_000, seed=5):
+    fuente = deal_sources.SyntheticSource(num_deals=num_deals, inicio=INICIO, fin=FIN, seed=seed)
+    return deal_store.columns_to_frame(fuente.columns, fuente.symbols)
+
+def stored(data_dir):
+    columnas, symbols = deal_store.load_columns(data_dir)
+    return {c: np.array(v) for c, v in columnas.items()}, symbols
+
+def assert_same_store(a, b):
+    assert a[1] == b[1]
+    for columna in deal_store.DEAL_COLUMNS:
+        np.testing.assert_array_equal(a[0][columna], b[0][columna], err_msg=columna)
+
+def first_append(data_dir, frame):
+    mitad = int(frame["time"].iloc[len(frame) // 2])
+    deal_store.append_deals(frame[frame["time"] < mitad + 86400], 0, data_dir)
+    return mitad
+
+def second_append(data_dir, frame, mitad):
+    # Segunda sincronización con solape: reescribe la cola desde la mitad
+    deal_store.append_deals(frame[frame["time"] >= mitad], mitad, data_dir)
+
+def test_interrupted_append_is_completed_on_next_read(tmp_path, monkeypatch):
+    frame = synthetic_frame()
+    second_append(str(tmp_path / "esperado"), frame, first_append(str(tmp_path / "esperado"), frame))
+    esperado = stored(str(tmp_path / "esperado"))
+
+    # La copia de la cola a las columnas se corta tras escribir el checkpoint:
+    # una columna queda truncada a medias y las demás sin actualizar
+    data_dir = str(tmp_path / "almacen")
+    mitad = first_append(data_dir, frame)
+    monkeypatch.setattr(deal_store, "_complete_pending", lambda d, checkpoint: checkpoint)
+    second_append(data_dir, frame, mitad)
+    monkeypatch.undo()
+    with open(os.path.join(data_dir, "checkpoint.json"), 'r', encoding='utf-8') as f:
+        pendiente = json.load(f)["pending"]
+    ruta = os.path.join(data_dir, "profit.bin")
+    with open(ruta, 'r+b') as f:
+        f.truncate(pendiente * 8)
+        f.seek(pendiente * 8)
+        f.write(b"\0" * 20)
+
+    assert deal_store.read_checkpoint(data_dir).get("pending") is None
+    assert_same_store(stored(data_dir), esperado)
+    assert not any(nombre.endswith(".tail") for nombre in os.listdir(data_dir))
+
+def test_append_interrupted_before_checkpoint_keeps_previous_store(tmp_path, monkeypatch):
+    frame = synthetic_frame()
+    data_dir = str(tmp_path)
+    mitad = first_append(data_dir, frame)
+    anterior = stored(data_dir)
+
+    def cortar(*args, **kwargs):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(deal_store, "_write_checkpoint", cortar)
+    with pytest.raises(KeyboardInterrupt):
+        second_append(data_dir, frame, mitad)
+    monkeypatch.undo()
+
+    assert_same_store(stored(data_dir), anterior)
+
+def test_pending_append_without_its_prefix_is_discarded(tmp_path, monkeypatch):
+    frame = synthetic_frame()
+    data_dir = str(tmp_path)
+    mitad = first_append(data_dir, frame)
+    monkeypatch.setattr(deal_store, "_complete_pending", lambda d, checkpoint: checkpoint)
+    second_append(data_dir, frame, mitad)
+    monkeypatch.undo()
+    with open(os.path.join(data_dir, "time.bin"), 'r+b') as f:
+        f.truncate(8)
+
+    assert deal_store.read_checkpoint(data_dir) is None
+
+def test_store_out_of_step_with_checkpoint_is_discarded(tmp_path):
+    frame = synthetic_frame()
+    data_dir = str(tmp_path)
+    deal_store.append_deals(frame, 0, data_dir)
+    ruta = os.path.join(data_dir, "profit.bin")
+    with open(ruta, 'r+b') as f:
+        f.truncate(os.path.getsize(ruta) // 2)
+
+    # Sin checkpoint la sincronización vuelve a descargar todo el historial
+    assert deal_store.read_checkpoint(data_dir) is None
+    assert len(deal_store.load_columns(data_dir)[0]["time"]) == 0
+    deal_store.append_deals(frame, 0, data_dir)
+    assert deal_store.read_checkpoint(data_dir)["rows"] == len(frame)
@@ -0,0 +1,71 @@
+# ---------------------------
+# PRUEBAS DEL ESTADO INCREMENTAL DE MÉTRICAS - MM LADRÓN DEL DOJI
+# ---------------------------
+# Aplicar el historial por lotes debe dejar los mismos agregados (totales,
+# cubetas diarias, desglose y permanencia) que un recálculo completo.
+#
+#   python -m pytest -q tests
+from datetime import datetime
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deal_sources
+import deal_store
+import metric_state
+import positions
+
+def synthetic_frame(num_deals, seed):
+    fuente = deal_sources.SyntheticSource(num_deals=num_deals, inicio=datetime(2024, 1, 1),
+                                          fin=datetime(2025, 6, 30), seed=seed)
+    return deal_store.columns_to_frame(fuente.columns, fuente.symbols)
+
+def with_partial_closes(frame, cada=7):
+    # Parte en dos cierres (el segundo tres días después) una de cada 'cada' posiciones
+    salidas = frame[(frame['entry'] == 1) & (frame['position_id'] % cada == 0)]
+    segunda = salidas.copy()
+    segunda['ticket'] += frame['ticket'].max()
+    segunda['time'] += 3 * 86400
+    segunda['volume'] /= 2
+    segunda['profit'] /= 2
+    frame = frame.copy()
+    frame.loc[salidas.index, 'volume'] /= 2
+    frame.loc[salidas.index, 'profit'] /= 2
+    return pd.concat([frame, segunda]).sort_values(['time', 'ticket'], kind='stable').reset_index(drop=True)
+
+def store_frame(frame):
+    # Mismos códigos de símbolo que el almacén
+    datos = frame.copy()
+    datos['symbol'] = pd.Categorical(datos['symbol'])
+    return datos
+
+def test_batches_match_full_recompute():
+    frame = store_frame(with_partial_closes(synthetic_frame(20_000, 11)))
+    columnas = {c: frame[c].to_numpy() for c in deal_store.DEAL_COLUMNS if c != "symbol"}
+    columnas["symbol"] = frame['symbol'].cat.codes.to_numpy()
+
+    estado = metric_state.MetricState(10000, 0.10)
+    for hasta in (1, 500, 7_000, 7_001, 15_000, len(frame)):
+        estado.apply_rows(columnas, estado.rows, hasta)
+        # El estado guardado entre lotes se recupera igual
+        estado = metric_state.MetricState.from_dict(estado.to_dict())
+
+    cierres = frame[frame['entry'] == 1]
+    diferencias = metric_state.verify_state(estado, cierres['time'].to_numpy(), cierres['profit'].to_numpy(), frame)
+    assert diferencias == {}
+    # Solo se arrastran las posiciones que siguen abiertas
+    assert len(estado.open_positions["position_id"]) < 100
+
+def test_partial_close_counts_position_once_with_last_exit():
+    abiertas, conteos = positions.empty_open_positions(), np.zeros(len(positions.HOLDING_TIME_BUCKETS), np.int64)
+    lotes = [
+        {"entry": [0, 1], "position_id": [1, 1], "time": [0, 600], "volume": [1.0, 0.4]},
+        {"entry": [1], "position_id": [1], "time": [5 * 3600], "volume": [0.6]},
+    ]
+    for lote in lotes:
+        abiertas, conteos = positions.track_positions(abiertas, conteos, {k: np.array(v) for k, v in lote.items()})
+    assert conteos.tolist() == [0, 0, 1, 0, 0]
+    assert len(abiertas["position_id"]) == 0
@@ -0,0 +1,163 @@
+# ---------------------------
+# PRUEBAS DEL MOTOR DE MÉTRICAS - MM LADRÓN DEL DOJI
+# ---------------------------
+# compute_metrics debe publicar exactamente las mismas cifras que el cálculo
+# original de main() (filtros de ganadoras/perdedoras, groupby por fecha y
+# máscaras por período), que se reproduce aquí tal cual como referencia.
+#
+#   python -m pytest -q tests
+from datetime import datetime, timedelta
+import math
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deal_sources
+import metrics_engine
+
+CAPITAL_INICIAL = 10000
+FACTOR_AJUSTE = 0.10
+INICIO = datetime(2024, 1, 1)
+AHORA = datetime(2025, 6, 30, 18, 0)
+
+def legacy_figures(trades_df, hoy):
+    """Cálculo de main() anterior al motor de métricas (solo datetime.now() pasa a ser 'hoy')"""
+    capital_inicial = CAPITAL_INICIAL
+    factor_ajuste = FACTOR_AJUSTE
+    trades_df = trades_df.copy()
+    trades_df['time_m'] = pd.to_datetime(trades_df['time'], unit='s')
+    operaciones_cerradas = trades_df[(trades_df['type'] <= 1) & (trades_df['entry'] == 1)].copy()
+
+    operaciones_cerradas = operaciones_cerradas.sort_values('time_m')
+    operaciones_cerradas['profit_real'] = operaciones_cerradas['profit']
+    operaciones_cerradas['ganancia_acum_abs'] = operaciones_cerradas['profit_real'].cumsum()
+    operaciones_cerradas['profit_percent'] = (operaciones_cerradas['profit_real'] / capital_inicial) * 100
+
+    ganancia_total_abs = operaciones_cerradas['profit_real'].sum()
+    ganancia_total_ajustada = ganancia_total_abs * factor_ajuste
+    ganancia_total_percent_ajustada = (ganancia_total_ajustada / capital_inicial) * 100
+
+    ganadoras = operaciones_cerradas[operaciones_cerradas['profit'] > 0]
+    perdedoras = operaciones_cerradas[operaciones_cerradas['profit'] < 0]
+    total_operaciones = len(operaciones_cerradas)
+    porcentaje_ganadoras = (len(ganadoras) / total_operaciones) * 100 if total_operaciones > 0 else 0
+
+    ganancia_total_ganadoras = ganadoras['profit_real'].sum() * factor_ajuste if len(ganadoras) > 0 else 0
+    perdida_total_perdedoras = abs(perdedoras['profit_real'].sum()) * factor_ajuste if len(perdedoras) > 0 else 0.01
+    profit_factor = ganancia_total_ganadoras / perdida_total_perdedoras if perdida_total_perdedoras > 0 else ganancia_total_ganadoras / 0.01
+    profit_factor = min(profit_factor, 3.5)
+
+    operaciones_cerradas['capital_acumulado_ajustado'] = capital_inicial + (operaciones_cerradas['ganancia_acum_abs'] * factor_ajuste)
+    operaciones_cerradas['max_capital_ajustado'] = operaciones_cerradas['capital_acumulado_ajustado'].expanding().max()
+    operaciones_cerradas['drawdown_ajustado'] = ((operaciones_cerradas['capital_acumulado_ajustado'] / operaciones_cerradas['max_capital_ajustado']) - 1) * 100
+    max_drawdown_historico = operaciones_cerradas['drawdown_ajustado'].min() if len(operaciones_cerradas) > 0 else 0
+    max_drawdown = min(max_drawdown_historico, -1.0) if max_drawdown_historico < 0 else 0
+
+    avg_ganancia = (ganadoras['profit_real'].mean() * factor_ajuste) if len(ganadoras) > 0 else 0
+    avg_perdida = (perdedoras['profit_real'].mean() * factor_ajuste) if len(perdedoras) > 0 else 0
+    prob_ganar = len(ganadoras) / total_operaciones
+    prob_perder = len(perdedoras) / total_operaciones
+    expectancy = (prob_ganar * avg_ganancia + prob_perder * avg_perdida) / capital_inicial * 100
+    if math.isnan(expectancy):
+        expectancy = 0
+
+    profits_ajustados = operaciones_cerradas['profit_real'] * factor_ajuste
+    if len(profits_ajustados) > 1 and profits_ajustados.std() > 0:
+        sharpe_ratio = min((profits_ajustados.mean() / profits_ajustados.std()) * np.sqrt(252), 2.5)
+    else:
+        sharpe_ratio = 1.2
+
+    if max_drawdown != 0:
+        return_risk = min(abs(ganancia_total_percent_ajustada / max_drawdown), 8.0)
+    else:
+        return_risk = ganancia_total_percent_ajustada / 0.01
+
+    operaciones_cerradas['fecha'] = operaciones_cerradas['time_m'].dt.date
+    fechas_ultimos_7dias = [(hoy.date() - timedelta(days=i)) for i in range(6, -1, -1)]
+    operaciones_por_fecha = operaciones_cerradas.groupby('fecha').size()
+    ganancias_por_dia = operaciones_cerradas.groupby('fecha')['profit_real'].sum()
+    recent_trades_data = [int(operaciones_por_fecha.get(fecha, 0)) for fecha in fechas_ultimos_7dias]
+    daily_profit_data = [int(ganancias_por_dia.get(fecha, 0) * factor_ajuste) for fecha in fechas_ultimos_7dias]
+
+    def rendimiento_desde(desde):
+        ventana = operaciones_cerradas[operaciones_cerradas['time_m'] >= desde]
+        return (ventana['profit_real'].sum() * factor_ajuste / capital_inicial) * 100
+
+    return {
+        "porcentaje_ganadoras": porcentaje_ganadoras,
+        "max_drawdown": max_drawdown,
+        "profit_factor": profit_factor,
+        "expectancy": expectancy,
+        "sharpe_ratio": sharpe_ratio,
+        "return_risk": return_risk,
+        "total_operaciones": total_operaciones,
+        "ganadoras": len(ganadoras),
+        "perdedoras": len(perdedoras),
+        "avg_win_percent": (ganadoras['profit_percent'].mean() * factor_ajuste if len(ganadoras) > 0 else 0),
+        "avg_loss_percent": (perdedoras['profit_percent'].mean() * factor_ajuste if len(perdedoras) > 0 else 0),
+        "weekly_performance": rendimiento_desde(hoy - timedelta(days=7)),
+        "monthly_performance": rendimiento_desde(hoy - timedelta(days=30)),
+        "quarterly_performance": rendimiento_desde(hoy - timedelta(days=90)),
+        "yearly_performance": rendimiento_desde(datetime(2024, 1, 1)),
+        "recent_trades_data": recent_trades_data,
+        "daily_profit_data": daily_profit_data,
+    }
+
+def _signed(valor, decimales):
+    return f"+{valor:.{decimales}f}%" if valor > 0 else f"{valor:.{decimales}f}%"
+
+# Cifra publicada en web_data.json -> (clave de las métricas, formato de update_trading_data)
+PUBLISHED = {
+    "winRate": ("porcentaje_ganadoras", lambda v: f"{v:.1f}%"),
+    "maxDrawdown": ("max_drawdown", lambda v: f"{v:.1f}%"),
+    "profitFactor": ("profit_factor", lambda v: f"{v:.1f}"),
+    "expectancy": ("expectancy", lambda v: _signed(v, 2)),
+    "sharpeRatio": ("sharpe_ratio", lambda v: f"{v:.2f}"),
+    "returnRisk": ("return_risk", lambda v: f"{v:.1f}"),
+    "totalTrades": ("total_operaciones", lambda v: f"{v}"),
+    "winningTrades": ("ganadoras", lambda v: f"{v}"),
+    "losingTrades": ("perdedoras", lambda v: f"{v}"),
+    "avgWin": ("avg_win_percent", lambda v: _signed(v, 2)),
+    "avgLoss": ("avg_loss_percent", lambda v: f"{v:.2f}%" if v <= 0 else f"+{v:.2f}%"),
+    "weeklyPerformance": ("weekly_performance", lambda v: _signed(v, 1)),
+    "monthlyPerformance": ("monthly_performance", lambda v: _signed(v, 1)),
+    "quarterlyPerformance": ("quarterly_performance", lambda v: _signed(v, 1)),
+    "yearlyPerformance": ("yearly_performance", lambda v: _signed(v, 1)),
+}
+
+def synthetic_deals(num_deals, seed):
+    fuente = deal_sources.SyntheticSource(num_deals=num_deals, inicio=INICIO, fin=AHORA, seed=seed)
+    return pd.DataFrame(fuente.columns)
+
+@pytest.mark.parametrize("num_deals,seed", [(2_000, 1), (30_000, 7)])
+def test_compute_metrics_matches_legacy_main(num_deals, seed):
+    trades_df = synthetic_deals(num_deals, seed)
+    esperado = legacy_figures(trades_df, AHORA)
+
+    cerradas = trades_df[(trades_df['type'] <= 1) & (trades_df['entry'] == 1)]
+    metricas = metrics_engine.compute_metrics(
+        cerradas['time'].to_numpy(), cerradas['profit'].to_numpy(), CAPITAL_INICIAL, FACTOR_AJUSTE, ahora=AHORA
+    )
+
+    for publicada, (clave, formato) in PUBLISHED.items():
+        assert formato(metricas[clave]) == formato(esperado[clave]), publicada
+        assert metricas[clave] == pytest.approx(esperado[clave], rel=1e-9, abs=1e-12), publicada
+    assert metricas["recent_trades_data"] == esperado["recent_trades_data"]
+    assert metricas["daily_profit_data"] == esperado["daily_profit_data"]
+
+def test_compute_metrics_without_losers():
+    # Sin perdedoras: profit factor con el divisor mínimo y sin drawdown
+    trades_df = synthetic_deals(2_000, 3)
+    trades_df['profit'] = trades_df['profit'].abs()
+    esperado = legacy_figures(trades_df, AHORA)
+
+    cerradas = trades_df[trades_df['entry'] == 1]
+    metricas = metrics_engine.compute_metrics(
+        cerradas['time'].to_numpy(), cerradas['profit'].to_numpy(), CAPITAL_INICIAL, FACTOR_AJUSTE, ahora=AHORA
+    )
+    for publicada, (clave, formato) in PUBLISHED.items():
+        assert formato(metricas[clave]) == formato(esperado[clave]), publicada
@@ -13,7 +13,7 @@ echo 🕐 Fecha y hora: %date% %time%
 echo.
 
 echo 🔄 Conectando con MT5...
-python update_trading_data.py
+python update_trading_data.py --page index.html --risk
 
 if %errorlevel% neq 0 (
     echo.
@@ -29,12 +29,12 @@ echo ✅ Proceso completado exitosamente!
 echo.
 
 echo 📊 RESUMEN:
-echo    - Archivo generado: web_data.json en el Escritorio
+echo    - Archivos generados: web_data.json, web_manifest.json, data\ y static\ en el Escritorio
 echo    - Listo para subir a la web
 echo.
 
 echo 📤 INSTRUCCIONES PARA SUBIR A LA WEB:
-echo    1. Copia web_data.json a tu carpeta del proyecto GitHub
+echo    1. Copia web_data.json, web_manifest.json y las carpetas data y static a tu carpeta del proyecto GitHub
 echo    2. Haz commit: git commit -m "Actualización datos trading"
 echo    3. Sube cambios: git push origin main
 echo    4. Netlify se actualizará automáticamente en 1-2 minutos
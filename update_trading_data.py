@@ -1,45 +1,118 @@
 # ---------------------------
 # GENERADOR DE DATOS PARA WEB - MM LADRÓN DEL DOJI
 # ---------------------------
-import MetaTrader5 as mt5
+# Solo módulos ligeros al importar: pandas, numpy, MetaTrader5 y los módulos de
+# cálculo se importan en las funciones que los usan, así que los subcomandos
+# fallback y validate (y cualquier import del módulo) arrancan sin pagarlos.
 from datetime import datetime, timedelta
-import pandas as pd
-import numpy as np
 import os
 import json
-import math
+import random
+import time
+import instrumentation
+import publisher
+
+# ---------------------------
+# ALMACÉN LOCAL DE OPERACIONES
+# ---------------------------
+HISTORY_START = datetime(2024, 1, 1)
+# Puntos de la curva de capital en "equityData" (las demás resoluciones van en "equityCurves")
+EQUITY_CHART_POINTS = 50
+# Número de operaciones publicadas en "latestTrades"
+LATEST_TRADES_COUNT = 200
+# Semanas publicadas en la tabla semanal de "periodReturns" (meses y años: todos)
+PERIOD_WEEKS_SHOWN = 12
+# Margen que se vuelve a descargar antes del checkpoint para recoger correcciones tardías
+SYNC_OVERLAP = timedelta(days=2)
+# Descargar el historial por ventanas ("month" o número de días) con memoria acotada
+STREAM_FETCH = True
+STREAM_WINDOW = "month"
+# Ventanas que se decodifican a la vez; la sesión se consulta siempre de una en una (1 = secuencial)
+STREAM_WORKERS = 1
+# Cifras principales desde el estado incremental guardado (metric_state.json)
+INCREMENTAL_METRICS = True
+# Comprobar el estado incremental contra un recálculo completo en cada ejecución
+VERIFY_METRIC_STATE = False
+# Simulación de riesgo Monte Carlo (bootstrap de los profits reales) en "riskData".
+# Desactivada por defecto: añade segundos a cada actualización con operaciones
+# nuevas, así que solo se pide (--risk) en la publicación manual de update_data.bat
+RISK_SIMULATION = False
+# Procesos para la simulación (None = todos los núcleos)
+RISK_WORKERS = None
+# Destino por defecto de web_data.json
+DEFAULT_JSON_PATH = os.path.join(os.path.expanduser("~"), "Desktop", "web_data.json")
+# Log NDJSON con el informe de cada ejecución (tiempos por etapa, operaciones, memoria)
+# (en el mismo directorio que deal_store.DATA_DIR)
+RUN_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos_mt5", "run_log.ndjson")
+# JSON sin indentación (menos bytes que escribir y servir)
+JSON_COMPACT = False
+# Publicar también web_manifest.json + data/<clave>.<hash>.json junto a web_data.json
+SPLIT_PAYLOAD = True
+# Publicar también static/ (SVG de los gráficos y fragmento HTML de las estadísticas)
+STATIC_RENDER = True
+# Página en la que se incrusta el fragmento entre sus marcadores (None = no incrustar).
+# Solo con --page (update_data.bat pasa index.html) y solo con datos reales de MT5
+STATIC_PAGE_PATH = None
+
+# ---------------------------
+# MODO DAEMON
+# ---------------------------
+DAEMON_INTERVAL = 300            # segundos entre actualizaciones
+RECONNECT_BACKOFF_START = 5      # primera espera tras perder la conexión
+RECONNECT_BACKOFF_MAX = 300      # espera máxima entre reintentos
+
+def apply_settings(ajustes):
+    """Sustituye constantes de configuración de este módulo (nombre -> valor), p. ej. las opciones de la CLI.
+    Los procesos de multi_account importan el módulo de nuevo y necesitan recibirlas explícitamente"""
+    for nombre, valor in ajustes.items():
+        if nombre not in globals():
+            raise KeyError(f"Ajuste desconocido: {nombre}")
+        globals()[nombre] = valor
+
+def main(fuente=None, json_path=DEFAULT_JSON_PATH, timer=None):
+    import deal_sources
 
-def main():
     print("🚀 INICIANDO GENERADOR DE DATOS PARA WEB...")
+    fuente = fuente or deal_sources.MT5Source()
     
     # ---------------------------
     # 1️⃣ CONECTAR A MT5
     # ---------------------------
-    if not mt5.initialize():
-        print("❌ Error al conectar con MT5:", mt5.last_error())
-        return create_fallback_data()
+    if not fuente.initialize():
+        print("❌ Error al conectar con MT5:", fuente.last_error())
+        return create_fallback_data(json_path)
     else:
-        print("✅ Conectado a MT5")
+        print(f"✅ Conectado a la fuente de operaciones: {fuente.name}")
 
+    try:
+        return generate_web_data(fuente, json_path=json_path, timer=timer)
+    finally:
+        fuente.shutdown()
+        print("🔌 Desconectado de MT5")
+
+def generate_web_data(fuente, fallback=True, json_path=DEFAULT_JSON_PATH, timer=None):
+    """Sincroniza, calcula y guarda los datos web usando la sesión ya abierta de la fuente"""
+    import downsampling
+    import metric_state
+    import deal_sources
+    import metrics_engine
+    import positions
+
+    timer = timer or instrumentation.StageTimer(run_log_path=RUN_LOG_PATH)
+    timer.start()
+    estado = "error"
     try:
         # ---------------------------
         # 2️⃣ OBTENER OPERACIONES CERRADAS
         # ---------------------------
-        inicio = datetime(2024, 1, 1)
-        fin = datetime.now()
-
-        print(f"📅 Buscando operaciones desde: {inicio.strftime('%d/%m/%Y')}")
-        print(f"📅 Hasta: {fin.strftime('%d/%m/%Y')}")
-
-        trades = mt5.history_deals_get(inicio, fin)
+        trades_df = sync_deals(fuente)
+        timer.lap("fetch")
 
-        if trades is None or len(trades) == 0:
+        if trades_df is None or len(trades_df) == 0:
             print("❌ No se encontraron operaciones en el historial")
-            return create_fallback_data()
+            estado = "no_deals"
+            return create_fallback_data(json_path) if fallback else None
 
-        # Convertir a DataFrame
-        trades_df = pd.DataFrame(list(trades), columns=trades[0]._asdict().keys())
-        trades_df['time_m'] = pd.to_datetime(trades_df['time'], unit='s')
         
         print(f"📊 Total de operaciones encontradas: {len(trades_df)}")
 
@@ -47,15 +120,19 @@ def main():
         operaciones_cerradas = trades_df[
             (trades_df['type'] <= 1) &  # Solo operaciones de compra/venta
             (trades_df['entry'] == 1)   # Solo entradas (para evitar duplicados)
-        ].copy()
+        ]
 
         print(f"🔍 Operaciones filtradas (entry=1): {len(operaciones_cerradas)}")
 
         if len(operaciones_cerradas) == 0:
             print("❌ No se encontraron operaciones de trading cerradas después del filtrado")
-            return create_fallback_data()
+            estado = "no_deals"
+            return create_fallback_data(json_path) if fallback else None
 
         print(f"✅ Operaciones CERRADAS encontradas: {len(operaciones_cerradas)}")
+        timer.count("deals_total", len(trades_df))
+        timer.count("deals_closed", len(operaciones_cerradas))
+        timer.lap("dataframe")
 
         # ---------------------------
         # 3️⃣ CONFIGURACIÓN Y CÁLCULOS
@@ -63,177 +140,116 @@ def main():
         capital_inicial = 10000
         factor_ajuste = 0.10
 
-        # Ordenar por tiempo y calcular acumulados
-        operaciones_cerradas = operaciones_cerradas.sort_values('time_m')
-        operaciones_cerradas['profit_real'] = operaciones_cerradas['profit']
-        operaciones_cerradas['ganancia_acum_abs'] = operaciones_cerradas['profit_real'].cumsum()
-        operaciones_cerradas['profit_percent'] = (operaciones_cerradas['profit_real'] / capital_inicial) * 100
-
-        # Estadísticas básicas
-        ganancia_total_abs = operaciones_cerradas['profit_real'].sum()
-        ganancia_total_percent = (ganancia_total_abs / capital_inicial) * 100
-        ganancia_total_ajustada = ganancia_total_abs * factor_ajuste
-        ganancia_total_percent_ajustada = (ganancia_total_ajustada / capital_inicial) * 100
-
-        # Clasificar operaciones
-        ganadoras = operaciones_cerradas[operaciones_cerradas['profit'] > 0]
-        perdedoras = operaciones_cerradas[operaciones_cerradas['profit'] < 0]
-        total_operaciones = len(operaciones_cerradas)
-        porcentaje_ganadoras = (len(ganadoras) / total_operaciones) * 100 if total_operaciones > 0 else 0
-
-        print(f"📈 Operaciones ganadoras: {len(ganadoras)}")
-        print(f"📉 Operaciones perdedoras: {len(perdedoras)}")
-        print(f"🎯 Win Rate: {porcentaje_ganadoras:.1f}%")
-
-        # Profit Factor ajustado
-        ganancia_total_ganadoras = ganadoras['profit_real'].sum() * factor_ajuste if len(ganadoras) > 0 else 0
-        perdida_total_perdedoras = abs(perdedoras['profit_real'].sum()) * factor_ajuste if len(perdedoras) > 0 else 0.01
-        profit_factor = ganancia_total_ganadoras / perdida_total_perdedoras if perdida_total_perdedoras > 0 else ganancia_total_ganadoras / 0.01
-        profit_factor = min(profit_factor, 3.5)
-
-        # Drawdown máximo
-        operaciones_cerradas['capital_acumulado_ajustado'] = capital_inicial + (operaciones_cerradas['ganancia_acum_abs'] * factor_ajuste)
-        operaciones_cerradas['max_capital_ajustado'] = operaciones_cerradas['capital_acumulado_ajustado'].expanding().max()
-        operaciones_cerradas['drawdown_ajustado'] = ((operaciones_cerradas['capital_acumulado_ajustado'] / operaciones_cerradas['max_capital_ajustado']) - 1) * 100
-        
-        max_drawdown_historico = operaciones_cerradas['drawdown_ajustado'].min() if len(operaciones_cerradas) > 0 else 0
-        max_drawdown = min(max_drawdown_historico, -1.0) if max_drawdown_historico < 0 else 0
-
-        # Expectancy
-        if total_operaciones > 0:
-            avg_ganancia = (ganadoras['profit_real'].mean() * factor_ajuste) if len(ganadoras) > 0 else 0
-            avg_perdida = (perdedoras['profit_real'].mean() * factor_ajuste) if len(perdedoras) > 0 else 0
-            prob_ganar = len(ganadoras) / total_operaciones
-            prob_perder = len(perdedoras) / total_operaciones
-            expectancy = (prob_ganar * avg_ganancia + prob_perder * avg_perdida) / capital_inicial * 100
-        else:
-            expectancy = 0
-
-        if math.isnan(expectancy):
-            expectancy = 0
-
-        # Sharpe Ratio
-        profits_ajustados = operaciones_cerradas['profit_real'] * factor_ajuste
-        if len(profits_ajustados) > 1 and profits_ajustados.std() > 0:
-            sharpe_ratio = (profits_ajustados.mean() / profits_ajustados.std()) * np.sqrt(252)
-            sharpe_ratio = min(sharpe_ratio, 2.5)
-        else:
-            sharpe_ratio = 1.2
-
-        # Return/Risk ratio
-        if max_drawdown != 0:
-            return_risk = abs(ganancia_total_percent_ajustada / max_drawdown)
-            return_risk = min(return_risk, 8.0)
-        else:
-            return_risk = ganancia_total_percent_ajustada / 0.01
+        # Agregados de las cifras principales, del desglose y de la permanencia:
+        # solo se aplican las operaciones nuevas
+        estado_metricas = None
+        totales = None
+        cubetas = None
+        if INCREMENTAL_METRICS:
+            estado_metricas, aplicadas, reconstruido = metric_state.refresh_state(fuente.store_dir, capital_inicial, factor_ajuste)
+            print(f"🧮 Estado de métricas: {aplicadas} filas nuevas aplicadas" + (" (reconstruido)" if reconstruido else ""))
+            timer.count("state_rows_applied", aplicadas)
+            totales = estado_metricas.totals()
+            cubetas = estado_metricas.buckets()
+            if VERIFY_METRIC_STATE:
+                diferencias = metric_state.verify_state(
+                    estado_metricas, operaciones_cerradas['time'].to_numpy(), operaciones_cerradas['profit'].to_numpy(), trades_df
+                )
+                if diferencias:
+                    print(f"⚠️ El estado incremental no coincide con el recálculo completo: {diferencias}")
+                    estado_metricas = None
+                    totales = None
+                    cubetas = None
+                else:
+                    print("✅ Estado incremental verificado contra el recálculo completo")
+            timer.lap("metric_state")
+
+        # Todas las métricas y series diarias se calculan en una sola pasada
+        metricas = metrics_engine.compute_metrics(
+            operaciones_cerradas['time'].to_numpy(),
+            operaciones_cerradas['profit'].to_numpy(),
+            capital_inicial,
+            factor_ajuste,
+            totales=totales,
+            cubetas=cubetas
+        )
+
+        print(f"📈 Operaciones ganadoras: {metricas['ganadoras']}")
+        print(f"📉 Operaciones perdedoras: {metricas['perdedoras']}")
+        print(f"🎯 Win Rate: {metricas['porcentaje_ganadoras']:.1f}%")
+
+        porcentaje_ganadoras = metricas['porcentaje_ganadoras']
+        weekly_performance = metricas['weekly_performance']
+        monthly_performance = metricas['monthly_performance']
+        quarterly_performance = metricas['quarterly_performance']
+        yearly_performance = metricas['yearly_performance']
+        max_drawdown = metricas['max_drawdown']
+        profit_factor = metricas['profit_factor']
+        expectancy = metricas['expectancy']
+        sharpe_ratio = metricas['sharpe_ratio']
+        return_risk = metricas['return_risk']
+        avg_win_percent = metricas['avg_win_percent']
+        avg_loss_percent = metricas['avg_loss_percent']
+        timer.lap("metrics")
 
         # ---------------------------
         # 4️⃣ PREPARAR DATOS PARA GRÁFICOS
         # ---------------------------
-        # Equity curve (últimos 12 puntos)
-        if len(operaciones_cerradas) > 0:
-            operaciones_cerradas['fecha'] = operaciones_cerradas['time_m'].dt.date
-            equity_por_dia = operaciones_cerradas.groupby('fecha')['ganancia_acum_abs'].last()
-            
-            num_puntos = min(12, len(equity_por_dia))
-            if num_puntos > 0:
-                indices = np.linspace(0, len(equity_por_dia)-1, num_puntos, dtype=int)
-                equity_labels = []
-                equity_data = []
-                
-                for idx in indices:
-                    fecha = equity_por_dia.index[idx]
-                    capital = capital_inicial + (equity_por_dia.iloc[idx] * factor_ajuste)
-                    equity_labels.append(fecha.strftime('%d/%m'))
-                    equity_data.append(int(capital))
-            else:
-                equity_labels, equity_data = create_sample_equity_data()
-        else:
+        # Curva de capital completa reducida con LTTB: conserva picos y drawdowns
+        resoluciones = sorted(set(downsampling.EQUITY_RESOLUTIONS) | {EQUITY_CHART_POINTS})
+        equity_curves = downsampling.equity_resolutions(metricas['equity_times'], metricas['equity_curve'], resoluciones)
+        equity_labels = equity_curves[str(EQUITY_CHART_POINTS)]['labels']
+        equity_data = equity_curves[str(EQUITY_CHART_POINTS)]['data']
+        if len(equity_data) == 0:
             equity_labels, equity_data = create_sample_equity_data()
 
-        # Operaciones recientes (últimos 7 días)
-        if len(operaciones_cerradas) > 0:
-            operaciones_cerradas['fecha'] = operaciones_cerradas['time_m'].dt.date
-            fechas_ultimos_7dias = [(datetime.now().date() - timedelta(days=i)) for i in range(6, -1, -1)]
-            operaciones_por_fecha = operaciones_cerradas.groupby('fecha').size()
-            
-            recent_trades_labels = []
-            recent_trades_data = []
-            
-            for fecha in fechas_ultimos_7dias:
-                fecha_str = fecha.strftime('%d/%m')
-                num_operaciones = operaciones_por_fecha.get(fecha, 0)
-                recent_trades_labels.append(fecha_str)
-                recent_trades_data.append(num_operaciones)
-        else:
-            recent_trades_labels, recent_trades_data = create_sample_recent_trades()
+        recent_trades_labels, recent_trades_data = metricas['recent_trades_labels'], metricas['recent_trades_data']
+        daily_profit_labels, daily_profit_data = metricas['daily_profit_labels'], metricas['daily_profit_data']
+        rolling_data = format_rolling_data(metricas['rolling'])
+        period_returns = format_period_returns(metricas['pnl_index'], capital_inicial, factor_ajuste)
+        timer.lap("chart_series")
 
-        # Ganancias diarias
-        if len(operaciones_cerradas) > 0:
-            ganancias_por_dia = operaciones_cerradas.groupby('fecha')['profit_real'].sum()
-            daily_profit_labels = []
-            daily_profit_data = []
-            
-            for fecha in fechas_ultimos_7dias:
-                fecha_str = fecha.strftime('%d/%m')
-                ganancia = ganancias_por_dia.get(fecha, 0) * factor_ajuste
-                daily_profit_labels.append(fecha_str)
-                daily_profit_data.append(int(ganancia))
+        # Desglose por símbolo y por dirección en una sola pasada agrupada.
+        # Las operaciones de cierre tienen el tipo contrario a la posición (un SELL cierra un BUY)
+        if estado_metricas is not None:
+            breakdown = estado_metricas.breakdown(operaciones_cerradas['symbol'].cat.categories)
         else:
-            daily_profit_labels, daily_profit_data = create_sample_daily_profits(recent_trades_data)
+            breakdown = metrics_engine.compute_breakdown(
+                operaciones_cerradas['symbol'].cat.codes.to_numpy(),
+                operaciones_cerradas['symbol'].cat.categories,
+                1 - operaciones_cerradas['type'].to_numpy(),
+                operaciones_cerradas['profit'].to_numpy(),
+                capital_inicial,
+                factor_ajuste
+            )
+        timer.lap("breakdown")
+
+        # Distribución de drawdown, rentabilidad y ruina sobre caminos remuestreados
+        risk_data = None
+        if RISK_SIMULATION:
+            import risk_engine
+            riesgo = risk_engine.cached_simulation(
+                fuente.store_dir, operaciones_cerradas['profit'].to_numpy(), capital_inicial, factor_ajuste, workers=RISK_WORKERS
+            )
+            risk_data = format_risk_data(riesgo)
+            timer.lap("risk")
 
         # ---------------------------
         # 🔥 NUEVA SECCIÓN: ÚLTIMAS OPERACIONES DETALLADAS
         # ---------------------------
-        latest_trades = []
-        if len(operaciones_cerradas) > 0:
-            # Ordenar por fecha más reciente y tomar las últimas 20 operaciones
-            operaciones_recientes = operaciones_cerradas.sort_values('time_m', ascending=False).head(20)
-            
-            for _, trade in operaciones_recientes.iterrows():
-                # Calcular duración (necesitaríamos el tiempo de cierre, pero usaremos una aproximación)
-                duracion_horas = np.random.randint(1, 24)  # Placeholder - necesitaríamos más datos de MT5
-                
-                trade_data = {
-                    "symbol": str(trade.get('symbol', 'EURUSD')),
-                    "type": "BUY" if trade.get('type', 0) == 0 else "SELL",
-                    "openTime": trade['time_m'].strftime('%d/%m/%Y %H:%M'),
-                    "closeTime": (trade['time_m'] + timedelta(hours=duracion_horas)).strftime('%d/%m/%Y %H:%M'),
-                    "duration": f"{duracion_horas}h",
-                    "profit": f"${trade['profit']:.2f}",
-                    "profitPercent": f"{(trade['profit'] / capital_inicial * 100 * factor_ajuste):.2f}%",
-                    "volume": f"{trade.get('volume', 0.1):.2f}",
-                    "price": f"{trade.get('price', 1.0):.5f}"
-                }
-                latest_trades.append(trade_data)
+        # Posiciones reales (entrada + salida por position_id) para duraciones y cierres
+        if estado_metricas is not None:
+            holding_time = positions.holding_time_data(estado_metricas.holding)
         else:
+            holding_time = positions.holding_time_distribution(positions.reconstruct_positions(trades_df))
+        print(f"🧩 Posiciones reconstruidas: {sum(holding_time['data'])}")
+        timer.count("positions", sum(holding_time['data']))
+
+        latest_trades = format_latest_trades(operaciones_cerradas, trades_df, capital_inicial, factor_ajuste)
+        if len(latest_trades) == 0:
             # Datos de ejemplo si no hay operaciones reales
             latest_trades = create_sample_latest_trades()
-
-        # Rendimiento por períodos
-        hoy = datetime.now()
-        if len(operaciones_cerradas) > 0:
-            # Última semana
-            ultima_semana = operaciones_cerradas[operaciones_cerradas['time_m'] >= (hoy - timedelta(days=7))]
-            weekly_performance = (ultima_semana['profit_real'].sum() * factor_ajuste / capital_inicial) * 100
-            
-            # Último mes
-            ultimo_mes = operaciones_cerradas[operaciones_cerradas['time_m'] >= (hoy - timedelta(days=30))]
-            monthly_performance = (ultimo_mes['profit_real'].sum() * factor_ajuste / capital_inicial) * 100
-            
-            # Últimos 3 meses
-            ultimos_3meses = operaciones_cerradas[operaciones_cerradas['time_m'] >= (hoy - timedelta(days=90))]
-            quarterly_performance = (ultimos_3meses['profit_real'].sum() * factor_ajuste / capital_inicial) * 100
-            
-            # Este año
-            este_año = operaciones_cerradas[operaciones_cerradas['time_m'] >= datetime(2024, 1, 1)]
-            yearly_performance = (este_año['profit_real'].sum() * factor_ajuste / capital_inicial) * 100
-        else:
-            weekly_performance, monthly_performance, quarterly_performance, yearly_performance = create_sample_performances()
-
-        # Promedios
-        avg_win_percent = (ganadoras['profit_percent'].mean() * factor_ajuste if len(ganadoras) > 0 else 0)
-        avg_loss_percent = (perdedoras['profit_percent'].mean() * factor_ajuste if len(perdedoras) > 0 else 0)
+        timer.lap("latest_trades")
 
         # ---------------------------
         # 5️⃣ CREAR ESTRUCTURA DE DATOS FINAL
@@ -248,24 +264,27 @@ def main():
             "expectancy": f"+{expectancy:.2f}%" if expectancy > 0 else f"{expectancy:.2f}%",
             "sharpeRatio": f"{sharpe_ratio:.2f}",
             "returnRisk": f"{return_risk:.1f}",
-            "totalTrades": f"{total_operaciones}",
-            "winningTrades": f"{len(ganadoras)}",
-            "losingTrades": f"{len(perdedoras)}",
+            "totalTrades": f"{metricas['total_operaciones']}",
+            "winningTrades": f"{metricas['ganadoras']}",
+            "losingTrades": f"{metricas['perdedoras']}",
             "avgWin": f"+{avg_win_percent:.2f}%" if avg_win_percent > 0 else f"{avg_win_percent:.2f}%",
             "avgLoss": f"{avg_loss_percent:.2f}%" if avg_loss_percent <= 0 else f"+{avg_loss_percent:.2f}%",
             "weeklyPerformance": f"+{weekly_performance:.1f}%" if weekly_performance > 0 else f"{weekly_performance:.1f}%",
             "monthlyPerformance": f"+{monthly_performance:.1f}%" if monthly_performance > 0 else f"{monthly_performance:.1f}%",
             "quarterlyPerformance": f"+{quarterly_performance:.1f}%" if quarterly_performance > 0 else f"{quarterly_performance:.1f}%",
             "yearlyPerformance": f"+{yearly_performance:.1f}%" if yearly_performance > 0 else f"{yearly_performance:.1f}%",
-            "dataSource": "MT5 Real",
+            "dataSource": fuente.name,
             
             # 🔥 NUEVO: Lista de últimas operaciones
             "latestTrades": latest_trades,
+            "holdingTimeData": holding_time,
+            "breakdown": breakdown,
             
             "equityData": {
                 "labels": equity_labels,
                 "data": [int(x) for x in equity_data]
             },
+            "equityCurves": equity_curves,
             "dailyProfitData": {
                 "labels": daily_profit_labels,
                 "data": [int(x) for x in daily_profit_data]
@@ -273,33 +292,247 @@ def main():
             "recentTradesData": {
                 "labels": recent_trades_labels,
                 "data": [int(x) for x in recent_trades_data]
-            }
+            },
+            "rollingData": rolling_data,
+            "periodReturns": period_returns
         }
+        if risk_data is not None:
+            web_data["riskData"] = risk_data
 
         # ---------------------------
         # 6️⃣ GUARDAR ARCHIVO JSON
         # ---------------------------
-        save_json_file(web_data)
+        # La página del proyecto solo recibe las cifras de la cuenta real, nunca las de pruebas
+        pagina = STATIC_PAGE_PATH if isinstance(fuente, deal_sources.MT5Source) else None
+        save_json_file(web_data, json_path, pagina=pagina)
+        timer.lap("json_write")
         
         # Mostrar resumen
-        show_summary(web_data, "MT5")
+        show_summary(web_data, fuente.name)
         
+        estado = "ok"
         return web_data
 
     except Exception as e:
         print(f"❌ Error durante el procesamiento: {e}")
         import traceback
         traceback.print_exc()
-        return create_fallback_data()
-    
+        return create_fallback_data(json_path) if fallback else None
+
+    finally:
+        timer.finish(estado, source=fuente.name)
+        print(timer.summary())
+
+# ---------------------------
+# SINCRONIZACIÓN INCREMENTAL
+# ---------------------------
+
+def sync_deals(fuente):
+    """Descarga solo las operaciones posteriores al checkpoint y las añade al almacén local"""
+    import pandas as pd
+    import deal_store
+    import deal_stream
+    import metrics_engine
+
+    checkpoint = deal_store.read_checkpoint(fuente.store_dir)
+    fin = datetime.now()
+
+    if checkpoint is None or checkpoint['rows'] == 0:
+        inicio = HISTORY_START
+        print(f"📅 Sin almacén local, descargando historial desde: {inicio.strftime('%d/%m/%Y')}")
+    else:
+        ultimo_tiempo = pd.to_datetime(checkpoint['last_time'], unit='s').to_pydatetime()
+        inicio = max(HISTORY_START, ultimo_tiempo - SYNC_OVERLAP)
+        print(f"📦 Almacén local: {checkpoint['rows']} operaciones (último ticket {checkpoint['last_ticket']})")
+        print(f"📅 Buscando operaciones nuevas desde: {inicio.strftime('%d/%m/%Y %H:%M')}")
+    print(f"📅 Hasta: {fin.strftime('%d/%m/%Y')}")
+
+    if STREAM_FETCH:
+        ventanas, descargadas = deal_stream.ingest(
+            fuente, inicio, fin, fuente.store_dir, STREAM_WINDOW, STREAM_WORKERS
+        )
+        if descargadas:
+            print(f"🆕 Operaciones descargadas en esta sincronización: {descargadas} ({ventanas} ventanas)")
+        return deal_store.load_deals_frame(fuente.store_dir)
+
+    nuevas_df = fuente.history_deals_frame(inicio, fin)
+
+    if nuevas_df is not None and len(nuevas_df) > 0:
+        print(f"🆕 Operaciones descargadas en esta sincronización: {len(nuevas_df)}")
+        # Las operaciones re-descargadas en el solape sustituyen a las guardadas
+        deal_store.append_deals(nuevas_df, int(metrics_engine.to_epoch_seconds(inicio)), fuente.store_dir)
+
+    return deal_store.load_deals_frame(fuente.store_dir)
+
+# ---------------------------
+# MODO DAEMON
+# ---------------------------
+
+def ensure_connection(fuente):
+    """Comprueba la sesión MT5 y reconecta con espera exponencial si el terminal se ha caído"""
+    if fuente.terminal_info() is not None:
+        return
+
+    espera = RECONNECT_BACKOFF_START
+    while True:
+        print(f"⚠️ Conexión con MT5 perdida: {fuente.last_error()}")
+        fuente.shutdown()
+        if fuente.initialize():
+            print("✅ Reconectado a MT5")
+            return
+        print(f"🔄 Reintentando en {espera}s...")
+        time.sleep(espera)
+        espera = min(espera * 2, RECONNECT_BACKOFF_MAX)
+
+def run_daemon(fuente=None, intervalo=DAEMON_INTERVAL, json_path=DEFAULT_JSON_PATH, timer_factory=None, servidor=None):
+    """Mantiene una única sesión MT5 abierta y regenera los datos cada 'intervalo' segundos.
+    Con 'servidor' (push_server.PushServer) cada actualización se envía en vivo a los navegadores conectados"""
+    import deal_sources
+
+    print(f"🛰️ MODO DAEMON: actualización cada {intervalo}s (Ctrl+C para salir)")
+    fuente = fuente or deal_sources.MT5Source()
+
+    if not fuente.initialize():
+        print("❌ Error al conectar con MT5:", fuente.last_error())
+    else:
+        print(f"✅ Conectado a la fuente de operaciones: {fuente.name}")
+
+    try:
+        while True:
+            ensure_connection(fuente)
+            inicio = time.perf_counter()
+            # Sin datos de ejemplo: un fallo puntual no debe sobrescribir los datos reales publicados
+            timer = timer_factory() if timer_factory else None
+            web_data = generate_web_data(fuente, fallback=False, json_path=json_path, timer=timer)
+            duracion = time.perf_counter() - inicio
+            if web_data is None:
+                print(f"⚠️ Actualización fallida ({duracion:.2f}s), se mantiene el archivo anterior")
+            else:
+                print(f"⏱️ Actualización completada en {duracion:.2f}s")
+                if servidor is not None:
+                    servidor.publish(web_data)
+            time.sleep(intervalo)
+    except KeyboardInterrupt:
+        print("\n🛑 Daemon detenido por el usuario")
     finally:
-        mt5.shutdown()
+        if servidor is not None:
+            servidor.stop()
+        fuente.shutdown()
         print("🔌 Desconectado de MT5")
 
 # ---------------------------
 # FUNCIONES AUXILIARES
 # ---------------------------
 
+def format_rolling_data(rolling):
+    """Series móviles para la web: una etiqueta por día y valores redondeados (null sin datos suficientes)"""
+    import numpy as np
+    import pandas as pd
+    import metrics_engine
+
+    def valores(serie, decimales):
+        redondeados = np.round(serie, decimales).astype(object)
+        redondeados[~np.isfinite(serie)] = None
+        return redondeados.tolist()
+
+    return {
+        "labels": pd.to_datetime(rolling["days"] * metrics_engine.SECONDS_PER_DAY, unit='s').strftime('%d/%m/%y').tolist(),
+        "windows": {
+            str(ventana): {
+                "sharpe": valores(serie["sharpe"], 2),
+                "winRate": valores(serie["win_rate"], 1),
+                "profitFactor": valores(serie["profit_factor"], 2)
+            }
+            for ventana, serie in rolling["windows"].items()
+        },
+        "underwater": valores(rolling["underwater"], 2)
+    }
+
+def format_risk_data(riesgo):
+    """Percentiles de la simulación de riesgo formateados como las cifras principales"""
+    def porcentaje(valor):
+        return f"+{valor:.1f}%" if valor > 0 else f"{valor:.1f}%"
+
+    return {
+        "paths": riesgo["paths"],
+        "horizon": riesgo["horizon"],
+        "maxDrawdown": {p: porcentaje(v) for p, v in riesgo["drawdown"].items()},
+        "finalReturn": {p: porcentaje(v) for p, v in riesgo["return"].items()},
+        "ruinProbability": f"{riesgo['ruin_probability']:.1f}%",
+        "ruinLoss": f"-{riesgo['ruin_loss']:.0f}%"
+    }
+
+def format_period_returns(indice, capital_inicial, factor_ajuste, ahora=None):
+    """Tablas de rendimiento por semana, mes y año natural más el YTD, consultadas sobre el índice de P&L"""
+    import pandas as pd
+
+    ahora = ahora or datetime.now()
+    formatos = {"week": '%d/%m/%y', "month": '%m/%Y', "year": '%Y'}
+
+    def tabla(periodo, ultimos=None):
+        filas = indice.period_table(periodo, capital_inicial, factor_ajuste)
+        etiquetas = pd.to_datetime(filas["starts"], unit='s').strftime(formatos[periodo]).tolist()
+        tramo = slice(-ultimos, None) if ultimos else slice(None)
+        return [
+            {"label": etiqueta, "return": f"+{r:.1f}%" if r > 0 else f"{r:.1f}%", "trades": int(n)}
+            for etiqueta, r, n in zip(etiquetas[tramo], filas["performance"][tramo].tolist(), filas["trades"][tramo].tolist())
+        ]
+
+    ytd = indice.performance(datetime(ahora.year, 1, 1), None, capital_inicial, factor_ajuste)
+    return {
+        "ytd": f"+{ytd:.1f}%" if ytd > 0 else f"{ytd:.1f}%",
+        "ytdTrades": int(indice.trades(datetime(ahora.year, 1, 1))),
+        "weeks": tabla("week", PERIOD_WEEKS_SHOWN),
+        "months": tabla("month"),
+        "years": tabla("year")
+    }
+
+def format_latest_trades(operaciones, deals_df, capital_inicial, factor_ajuste, cantidad=LATEST_TRADES_COUNT):
+    """Selecciona las 'cantidad' operaciones más recientes y las formatea en bloque para la web"""
+    import numpy as np
+    import pandas as pd
+    import positions
+
+    total = len(operaciones)
+    cantidad = min(cantidad, total)
+    if cantidad == 0:
+        return []
+
+    # Selección parcial O(n) en lugar de ordenar todo el historial
+    tiempos = operaciones['time'].to_numpy()
+    indices = np.argpartition(tiempos, total - cantidad)[total - cantidad:]
+    indices = indices[np.argsort(-tiempos[indices], kind='stable')]
+    recientes = operaciones.iloc[indices]
+
+    # Apertura y dirección reales de la posición a la que pertenece cada cierre
+    # (solo se reconstruyen las posiciones de las operaciones mostradas)
+    posiciones = positions.reconstruct_positions(positions.positions_of(deals_df, recientes['position_id'].to_numpy()))
+    por_posicion = posiciones.set_index('position_id').reindex(recientes['position_id'].to_numpy())
+    conocida = por_posicion['open_time'].notna().to_numpy()
+    tiempos_cierre = recientes['time'].to_numpy()
+    tiempos_apertura = np.where(conocida, por_posicion['open_time'].fillna(0).to_numpy(), tiempos_cierre).astype(np.int64)
+    # Sin la entrada en el historial, la dirección es la contraria a la operación de cierre
+    tipos = np.where(conocida, por_posicion['type'].fillna(0).to_numpy(), 1 - recientes['type'].to_numpy())
+
+    apertura = pd.to_datetime(tiempos_apertura, unit='s')
+    cierre = pd.to_datetime(tiempos_cierre, unit='s')
+    duraciones = np.where(conocida, positions.format_durations(tiempos_cierre - tiempos_apertura), "N/A")
+    profits = recientes['profit'].to_numpy()
+
+    columnas = {
+        "symbol": recientes['symbol'].astype(str).to_numpy(),
+        "type": np.where(tipos == 0, "BUY", "SELL"),
+        "openTime": apertura.strftime('%d/%m/%Y %H:%M'),
+        "closeTime": cierre.strftime('%d/%m/%Y %H:%M'),
+        "duration": duraciones,
+        "profit": np.char.mod("$%.2f", profits),
+        "profitPercent": np.char.mod("%.2f%%", profits / capital_inicial * 100 * factor_ajuste),
+        "volume": np.char.mod("%.2f", recientes['volume'].to_numpy()),
+        "price": np.char.mod("%.5f", recientes['price'].to_numpy())
+    }
+    claves = list(columnas)
+    return [dict(zip(claves, fila)) for fila in zip(*(columnas[c].tolist() for c in claves))]
+
 def create_sample_latest_trades():
     """Crea datos de ejemplo para últimas operaciones"""
     sample_trades = []
@@ -307,7 +540,7 @@ def create_sample_latest_trades():
     
     for i in range(10):
         symbol = symbols[i % len(symbols)]
-        profit = np.random.uniform(5, 50)
+        profit = random.uniform(5, 50)
         trade_type = "BUY" if i % 2 == 0 else "SELL"
         
         trade_data = {
@@ -315,17 +548,17 @@ def create_sample_latest_trades():
             "type": trade_type,
             "openTime": (datetime.now() - timedelta(hours=i*2)).strftime('%d/%m/%Y %H:%M'),
             "closeTime": (datetime.now() - timedelta(hours=i*2-1)).strftime('%d/%m/%Y %H:%M'),
-            "duration": f"{np.random.randint(1, 6)}h",
+            "duration": f"{random.randrange(1, 6)}h",
             "profit": f"${profit:.2f}",
             "profitPercent": f"+{profit/100:.2f}%",
-            "volume": f"{np.random.uniform(0.1, 1.0):.2f}",
-            "price": f"{np.random.uniform(1.0, 1.2):.5f}"
+            "volume": f"{random.uniform(0.1, 1.0):.2f}",
+            "price": f"{random.uniform(1.0, 1.2):.5f}"
         }
         sample_trades.append(trade_data)
     
     return sample_trades
 
-def create_fallback_data():
+def create_fallback_data(json_path=DEFAULT_JSON_PATH):
     """Crea datos de ejemplo cuando no hay conexión a MT5"""
     print("🔄 Creando datos de ejemplo...")
     
@@ -370,7 +603,7 @@ def create_fallback_data():
         }
     }
     
-    save_json_file(web_data)
+    save_json_file(web_data, json_path)
     show_summary(web_data, "EJEMPLO")
     return web_data
 
@@ -396,7 +629,7 @@ def create_sample_recent_trades():
     
     for i in range(7):
         date = (datetime.now() - timedelta(days=6-i)).strftime('%d/%m')
-        trades = max(2, np.random.randint(3, 8))
+        trades = max(2, random.randrange(3, 8))
         labels.append(date)
         data.append(trades)
     
@@ -409,8 +642,8 @@ def create_sample_daily_profits(recent_trades_data):
     
     for i in range(len(recent_trades_data)):
         date = (datetime.now() - timedelta(days=6-i)).strftime('%d/%m')
-        profit = recent_trades_data[i] * np.random.randint(5, 15)
-        if np.random.random() < 0.3:
+        profit = recent_trades_data[i] * random.randrange(5, 15)
+        if random.random() < 0.3:
             profit = -profit * 0.5
         labels.append(date)
         data.append(profit)
@@ -421,22 +654,36 @@ def create_sample_performances():
     """Crea datos de ejemplo para rendimientos"""
     return 0.8, 2.1, 6.3, 18.5
 
-def save_json_file(web_data):
-    """Guarda los datos en un archivo JSON"""
-    desktop = os.path.join(os.path.expanduser("~"), "Desktop")
-    json_path = os.path.join(desktop, "web_data.json")
-    
+def save_json_file(web_data, json_path=DEFAULT_JSON_PATH, pagina=None):
+    """Guarda los datos en un archivo JSON (escritura atómica, solo si el contenido cambió).
+    Con 'pagina', incrusta además las estadísticas en esa página"""
     try:
-        if os.path.exists(json_path):
-            os.remove(json_path)
-            print(f"🗑️ Archivo anterior eliminado: {json_path}")
-        
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(web_data, f, ensure_ascii=False, indent=2)
-        print(f"✅ Archivo JSON guardado en: {json_path}")
+        if publisher.publish_json(web_data, json_path, compact=JSON_COMPACT):
+            print(f"✅ Archivo JSON guardado en: {json_path}")
+        else:
+            print(f"⏭️ Sin cambios en los datos, no se reescribe: {json_path}")
+
+        if SPLIT_PAYLOAD:
+            carpeta = os.path.dirname(os.path.abspath(json_path))
+            manifiesto, escrito = publisher.publish_split(web_data, carpeta, compact=JSON_COMPACT)
+            if escrito:
+                print(f"🧩 Manifiesto y {len(manifiesto['chunks'])} fragmentos publicados en: {carpeta}")
+
+        if STATIC_RENDER:
+            publish_static_files(web_data, os.path.dirname(os.path.abspath(json_path)), pagina)
     except Exception as e:
         print(f"❌ Error guardando JSON: {e}")
 
+def publish_static_files(web_data, carpeta, pagina=None):
+    """Publica los SVG y el fragmento de estadísticas, y lo incrusta en 'pagina' si tiene los marcadores"""
+    import static_render
+    fragmento, escritos = static_render.publish_static(web_data, carpeta)
+    if escritos:
+        print(f"🖼️ Vista estática publicada en: {os.path.join(carpeta, static_render.STATIC_DIR)} ({', '.join(escritos)})")
+    if pagina and os.path.exists(pagina):
+        if static_render.inline_fragment(pagina, fragmento):
+            print(f"🖼️ Estadísticas incrustadas en: {pagina}")
+
 def show_summary(web_data, source):
     """Muestra un resumen de los datos generados"""
     print("\n" + "="*60)
@@ -451,10 +698,153 @@ def show_summary(web_data, source):
     print(f"📁 Archivo: web_data.json en el Escritorio")
     print("="*60)
 
+# ---------------------------
+# VALIDACIÓN DE LOS DATOS PUBLICADOS
+# ---------------------------
+REQUIRED_KEYS = [
+    "lastUpdate", "totalProfit", "monthlyProfit", "winRate", "maxDrawdown", "profitFactor", "expectancy",
+    "sharpeRatio", "returnRisk", "totalTrades", "winningTrades", "losingTrades", "avgWin", "avgLoss",
+    "weeklyPerformance", "monthlyPerformance", "quarterlyPerformance", "yearlyPerformance", "dataSource",
+    "latestTrades", "equityData", "dailyProfitData", "recentTradesData"
+]
+SERIES_KEYS = ["equityData", "dailyProfitData", "recentTradesData"]
+PERCENT_KEYS = ["totalProfit", "monthlyProfit", "winRate", "maxDrawdown", "expectancy", "avgWin", "avgLoss",
+                "weeklyPerformance", "monthlyPerformance", "quarterlyPerformance", "yearlyPerformance"]
+
+def validate_web_data(web_data):
+    """Comprueba la estructura que espera index.html. Devuelve la lista de problemas"""
+    problemas = [f"falta la clave '{clave}'" for clave in REQUIRED_KEYS if clave not in web_data]
+    for clave in SERIES_KEYS:
+        serie = web_data.get(clave)
+        if isinstance(serie, dict) and len(serie.get("labels", [])) != len(serie.get("data", [])):
+            problemas.append(f"'{clave}': labels y data tienen longitudes distintas")
+    for clave in PERCENT_KEYS:
+        if clave in web_data and not str(web_data[clave]).endswith("%"):
+            problemas.append(f"'{clave}' no es un porcentaje: {web_data[clave]}")
+    if not isinstance(web_data.get("latestTrades", []), list):
+        problemas.append("'latestTrades' no es una lista")
+    return problemas
+
+def validate_published(json_path=DEFAULT_JSON_PATH):
+    """Valida web_data.json y, si existe, el manifiesto con sus fragmentos. Devuelve la lista de problemas"""
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            web_data = json.load(f)
+    except (OSError, ValueError) as e:
+        return [f"{json_path}: {e}"]
+
+    problemas = validate_web_data(web_data)
+    carpeta = os.path.dirname(os.path.abspath(json_path))
+    if os.path.exists(os.path.join(carpeta, publisher.MANIFEST_NAME)):
+        reensamblado, problemas_split = publisher.verify_split(carpeta)
+        problemas += problemas_split
+        if reensamblado is not None and publisher.content_hash(reensamblado) != publisher.content_hash(web_data):
+            problemas.append(f"{publisher.MANIFEST_NAME} y sus fragmentos no coinciden con {os.path.basename(json_path)}")
+    return problemas
+
 # ---------------------------
 # EJECUCIÓN PRINCIPAL
 # ---------------------------
 if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Generador de datos para web - MM Ladrón del Doji")
+    subcomandos = parser.add_subparsers(dest="command")
+
+    # Opciones de publicación comunes a generate y fallback
+    salida = argparse.ArgumentParser(add_help=False)
+    salida.add_argument("--output", default=DEFAULT_JSON_PATH, help="ruta de web_data.json")
+    salida.add_argument("--compact", action="store_true", help="escribir web_data.json sin indentación")
+    salida.add_argument("--no-split", action="store_true", help="no publicar el manifiesto ni los fragmentos con hash")
+    salida.add_argument("--no-static", action="store_true", help="no publicar los SVG ni el fragmento HTML de static/")
+    salida.add_argument("--page", default=STATIC_PAGE_PATH, help="página en la que incrustar las estadísticas (solo con la cuenta MT5 real)")
+
+    generar = subcomandos.add_parser("generate", parents=[salida], help="sincronizar operaciones y generar los datos (por defecto)")
+    generar.add_argument("--daemon", action="store_true", help="mantener la sesión MT5 abierta y actualizar periódicamente")
+    generar.add_argument("--interval", type=int, default=DAEMON_INTERVAL, help="segundos entre actualizaciones en modo daemon")
+    generar.add_argument("--serve", type=int, metavar="PUERTO", help="modo daemon con servidor de actualizaciones en vivo (SSE) en este puerto")
+    generar.add_argument("--serve-host", default="127.0.0.1", help="interfaz en la que escucha el servidor en vivo")
+    generar.add_argument("--accounts", help="JSON con varias cuentas a procesar en paralelo (ver accounts.example.json)")
+    generar.add_argument("--workers", type=int, help="procesos en paralelo con --accounts")
+    generar.add_argument("--source", choices=["mt5", "synthetic", "replay"], default="mt5", help="fuente de operaciones")
+    generar.add_argument("--deals", type=int, default=10_000, help="operaciones a generar con --source synthetic")
+    generar.add_argument("--symbols", type=int, default=20, help="símbolos distintos con --source synthetic")
+    generar.add_argument("--no-stream", action="store_true", help="descargar el rango de una vez en lugar de por ventanas")
+    generar.add_argument("--window", default=STREAM_WINDOW, help="ventana de descarga: 'month' o número de días")
+    generar.add_argument("--fetch-workers", type=int, default=STREAM_WORKERS, help="ventanas que se decodifican a la vez (la sesión MT5 se consulta de una en una)")
+    generar.add_argument("--no-incremental", action="store_true", help="recalcular las cifras principales sin el estado guardado")
+    generar.add_argument("--verify-state", action="store_true", help="comprobar el estado incremental contra un recálculo completo")
+    generar.add_argument("--risk", action="store_true", help="añadir la simulación de riesgo Monte Carlo (riskData)")
+    generar.add_argument("--risk-workers", type=int, help="procesos para la simulación de riesgo (por defecto, todos los núcleos)")
+    generar.add_argument("--run-log", default=RUN_LOG_PATH, help="log NDJSON con el informe de cada ejecución")
+    generar.add_argument("--metrics-file", help="escribir también las métricas en formato de texto Prometheus")
+    generar.add_argument("--trace-memory", action="store_true", help="medir el pico de memoria Python por etapa (tracemalloc)")
+
+    subcomandos.add_parser("fallback", parents=[salida], help="publicar datos de ejemplo sin conectar con MT5 (sin pandas ni numpy)")
+
+    validar = subcomandos.add_parser("validate", help="comprobar web_data.json, el manifiesto y sus fragmentos")
+    validar.add_argument("path", nargs="?", default=DEFAULT_JSON_PATH, help="ruta de web_data.json")
+
+    # Sin subcomando (o solo con opciones, como en update_data.bat) se ejecuta generate
+    argumentos = sys.argv[1:]
+    if not argumentos or argumentos[0] not in subcomandos.choices and argumentos[0] not in ("-h", "--help"):
+        argumentos = ["generate"] + argumentos
+    args = parser.parse_args(argumentos)
+
+    if args.command == "validate":
+        problemas = validate_published(args.path)
+        for problema in problemas:
+            print(f"❌ {problema}")
+        if not problemas:
+            print(f"✅ Datos publicados válidos: {args.path}")
+        sys.exit(1 if problemas else 0)
+
+    ajustes = {
+        "JSON_COMPACT": args.compact,
+        "SPLIT_PAYLOAD": not args.no_split,
+        "STATIC_RENDER": not args.no_static,
+        "STATIC_PAGE_PATH": args.page or None,
+    }
+    apply_settings(ajustes)
+
     print("🚀 GENERADOR DE DATOS PARA WEB - MM LADRÓN DEL DOJI")
     print("=" * 50)
-    main()
\ No newline at end of file
+    if args.command == "fallback":
+        create_fallback_data(args.output)
+        sys.exit(0)
+
+    import deal_sources
+
+    ajustes.update({
+        "STREAM_FETCH": not args.no_stream,
+        "STREAM_WINDOW": args.window,
+        "STREAM_WORKERS": args.fetch_workers,
+        "INCREMENTAL_METRICS": not args.no_incremental,
+        "VERIFY_METRIC_STATE": args.verify_state,
+        "RISK_SIMULATION": args.risk,
+        "RISK_WORKERS": args.risk_workers,
+    })
+    apply_settings(ajustes)
+
+    def crear_timer():
+        return instrumentation.StageTimer(args.trace_memory, args.run_log, args.metrics_file)
+
+    if args.source == "synthetic":
+        fuente = deal_sources.get_source("synthetic", num_deals=args.deals, num_symbols=args.symbols)
+    else:
+        fuente = deal_sources.get_source(args.source)
+
+    if args.accounts:
+        import multi_account
+        multi_account.run_accounts(args.accounts, args.workers, ajustes)
+    elif args.daemon or args.serve is not None:
+        servidor = None
+        if args.serve is not None:
+            import push_server
+            servidor = push_server.PushServer(args.serve_host, args.serve).start()
+            print(f"📡 Actualizaciones en vivo en http://{servidor.host}:{servidor.port}/events "
+                  f"(abre index.html?live=http://{servidor.host}:{servidor.port})")
+        run_daemon(fuente, args.interval, args.output, crear_timer, servidor)
+    else:
+        main(fuente, args.output, crear_timer())